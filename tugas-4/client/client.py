@@ -2,6 +2,9 @@ import socket
 import logging
 import ssl
 import os
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 server_address = ('127.0.0.1', 8080)
 
@@ -101,12 +104,138 @@ def handle_client_upload(filename):
     return request.decode('latin1')
 
 
+def read_response_head(sock):
+    """Membaca status dan header response, sisa data (awal body) ikut dikembalikan"""
+    data = b''
+    while b'\r\n\r\n' not in data:
+        chunk = sock.recv(65536)
+        if not chunk:
+            raise ConnectionError('connection closed before response headers')
+        data += chunk
+    head, rest = data.split(b'\r\n\r\n', 1)
+    lines = head.decode('latin1').split('\r\n')
+    status = int(lines[0].split(' ')[1])
+    headers = {}
+    for line in lines[1:]:
+        key, _, value = line.partition(':')
+        headers[key.strip().lower()] = value.strip()
+    return status, headers, rest
+
+
+def request_range(path, start, end, if_range=None, is_secure=False):
+    """Mengirim GET dengan header Range, socket dikembalikan setelah header response dibaca"""
+    ip, port = server_address
+    sock = make_secure_socket(ip, port) if is_secure else make_socket(ip, port)
+    request = f"GET /{path} HTTP/1.1\r\nHost: localhost\r\nRange: bytes={start}-{end}\r\n"
+    if if_range:
+        request += f"If-Range: {if_range}\r\n"
+    sock.sendall((request + "\r\n").encode())
+    status, headers, rest = read_response_head(sock)
+    return sock, status, headers, rest
+
+
+def fetch_segment(path, fd, start, end, etag, is_secure=False):
+    """Mengunduh satu range dan menulisnya ke posisinya di file dengan pwrite"""
+    sock, status, headers, data = request_range(path, start, end, etag, is_secure)
+    try:
+        if status != 206:
+            raise RuntimeError(f'range {start}-{end} not served (status {status}), file changed on server?')
+        offset = start
+        remaining = end - start + 1
+        while True:
+            if data:
+                data = data[:remaining]
+                os.pwrite(fd, data, offset)
+                offset += len(data)
+                remaining -= len(data)
+            if remaining == 0:
+                return
+            data = sock.recv(min(remaining, 1048576))
+            if not data:
+                raise ConnectionError(f'connection closed with {remaining} bytes left in range {start}-{end}')
+    finally:
+        sock.close()
+
+
+def download_resumable(filename, target=None, connections=4, segment_size=1048576, is_secure=False):
+    """Mengunduh file dalam beberapa range secara paralel (satu koneksi per range).
+    segmen yang sudah selesai dicatat di <target>.progress sehingga unduhan
+    yang terputus dapat dilanjutkan tanpa mengulang dari awal"""
+    target = target or os.path.basename(filename)
+    part_path = target + '.part'
+    progress_path = target + '.progress'
+
+    # cari tahu ukuran dan ETag file dengan meminta byte pertama
+    sock, status, headers, _ = request_range(filename, 0, 0, is_secure=is_secure)
+    sock.close()
+    if status == 206:
+        size = int(headers['content-range'].rsplit('/', 1)[1])
+    elif status == 200:
+        size = int(headers.get('content-length', 0))
+    elif status == 416 and headers.get('content-range', '').strip() == 'bytes */0':
+        # file kosong: tidak ada byte pertama yang bisa diminta
+        size = 0
+    else:
+        print(f"Download gagal, status {status}")
+        return False
+    etag = headers.get('etag')
+
+    progress = dict(etag=etag, size=size, segment_size=segment_size, done=[])
+    if os.path.exists(progress_path) and os.path.exists(part_path):
+        with open(progress_path) as f:
+            saved = json.load(f)
+        if saved.get('etag') == etag and saved.get('size') == size and etag:
+            progress = saved
+            segment_size = saved['segment_size']
+
+    segments = [(i, i * segment_size, min((i + 1) * segment_size, size) - 1)
+                for i in range((size + segment_size - 1) // segment_size)]
+    done = set(progress['done'])
+    pending = [seg for seg in segments if seg[0] not in done]
+    print(f"{filename}: {size} bytes, {len(segments) - len(pending)}/{len(segments)} segmen sudah ada")
+
+    lock = threading.Lock()
+
+    def save_progress(index):
+        with lock:
+            progress['done'].append(index)
+            with open(progress_path + '.tmp', 'w') as f:
+                json.dump(progress, f)
+            os.replace(progress_path + '.tmp', progress_path)
+
+    def worker(segment):
+        index, start, end = segment
+        fetch_segment(filename, fd, start, end, etag, is_secure)
+        save_progress(index)
+
+    fd = os.open(part_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        os.ftruncate(fd, size)
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            for result in executor.map(worker, pending):
+                pass
+    except Exception as ee:
+        logging.warning(f"download terhenti: {str(ee)}")
+        print("Download terhenti, jalankan lagi untuk melanjutkan")
+        return False
+    finally:
+        os.close(fd)
+
+    os.replace(part_path, target)
+    # progress baru ditulis setelah segmen pertama selesai (file kosong tidak punya segmen)
+    if os.path.exists(progress_path):
+        os.remove(progress_path)
+    print(f"Download selesai: {target}")
+    return True
+
+
 def show_menu():
     print("\n=== HTTP Client Menu ===")
     print("  1. GET    /list         - List directory files")
     print("  2. GET    /filename     - Download file")
     print("  3. POST   /upload       - Upload file")
     print("  4. DELETE /filename     - Delete file")
+    print("  5. GET    /filename     - Download file (paralel, dapat dilanjutkan)")
     print("  0. Exit")
     choice = input("Enter menu number: ").strip()
     return choice
@@ -133,11 +262,17 @@ def handle_user_choice(choice):
             "Enter filename to delete (must exist in files/): ").strip()
         return f"DELETE /{filename} HTTP/1.1\r\nHost: localhost\r\n\r\n"
 
+    elif choice == '5':
+        filename = input(
+            "Enter filename to download (e.g. rfc2616.pdf): ").strip()
+        download_resumable(filename)
+        return None
+
     elif choice == '0':
         return "EXIT"
 
     else:
-        print("Invalid choice. Please enter a number between 0 and 4.")
+        print("Invalid choice. Please enter a number between 0 and 5.")
         return None
 
 
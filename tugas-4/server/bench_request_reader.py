@@ -0,0 +1,102 @@
+import argparse
+import os
+import socket
+import threading
+import time
+
+from request_reader import RequestReader
+
+"""
+* micro-benchmark biaya parsing per request lewat socket sungguhan
+(socketpair), termasuk biaya system call recv:
+  - legacy : loop lama di server (recv(32), decode utf-8, str +=, cek endswith('\r\n'))
+  - reader : RequestReader (recv_into ke buffer besar, parsing bytes, Content-Length)
+
+* sebuah thread mengirim request yang sama --count kali berturut-turut,
+sisi penerima mengukur waktu sampai semua request terbaca
+
+* loop lama hanya diukur untuk GET: request dengan body biner tidak
+bisa didecode, dan request dengan body terpotong begitu sebuah potongan
+berakhir dengan "\r\n"
+"""
+
+GET_REQUEST = (
+    b'GET /rfc2616.pdf HTTP/1.1\r\n'
+    b'Host: localhost:8080\r\n'
+    b'User-Agent: Mozilla/5.0 (X11; Linux x86_64; rv:126.0) Gecko/20100101 Firefox/126.0\r\n'
+    b'Accept: text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8\r\n'
+    b'Accept-Language: en-US,en;q=0.5\r\n'
+    b'Accept-Encoding: gzip, deflate, br\r\n'
+    b'Connection: keep-alive\r\n'
+    b'If-None-Match: "1a2b3c-86626-17f0c2a9b1d2e3f4"\r\n'
+    b'\r\n'
+)
+
+
+def make_post(body_kb):
+    body = os.urandom(body_kb * 1024)
+    head = (f'POST /upload HTTP/1.1\r\nHost: localhost\r\n'
+            f'Content-Type: application/octet-stream\r\nContent-Length: {len(body)}\r\n\r\n')
+    return head.encode() + body
+
+
+def run_legacy(connection, request, count):
+    """Membaca data sebanyak count request dengan cara loop lama"""
+    remaining = len(request) * count
+    rcv = ""
+    while remaining:
+        data = connection.recv(32)
+        remaining -= len(data)
+        rcv = rcv + data.decode()
+        if rcv.endswith('\r\n'):
+            rcv = ""
+    return count
+
+
+def run_reader(connection, request, count):
+    reader = RequestReader()
+    parsed = 0
+    while parsed < count and reader.recv_from(connection):
+        for _ in reader.requests():
+            parsed += 1
+    return parsed
+
+
+def measure(runner, request, count):
+    receiver, sender = socket.socketpair()
+    writer = threading.Thread(target=lambda: [sender.sendall(request) for _ in range(count)])
+    start = time.perf_counter()
+    writer.start()
+    parsed = runner(receiver, request, count)
+    duration = time.perf_counter() - start
+    writer.join()
+    receiver.close()
+    sender.close()
+    assert parsed == count, f"expected {count} requests, got {parsed}"
+    return duration / count * 1e6
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='RequestReader micro-benchmark')
+    parser.add_argument('--count', type=int, default=20000, help='Requests per measurement')
+    parser.add_argument('--body-kb', type=int, nargs='+', default=[1, 64, 1024],
+                        help='POST body sizes in KB (default: 1 64 1024)')
+    args = parser.parse_args()
+
+    cases = [('GET', GET_REQUEST, args.count, True)]
+    for body_kb in args.body_kb:
+        # request besar diulang lebih sedikit agar waktu total tetap wajar
+        cases.append((f'POST {body_kb}KB', make_post(body_kb), max(10, args.count // body_kb), False))
+
+    print(f"{'request':>12} {'bytes':>9} {'legacy_us':>10} {'reader_us':>10} {'speedup':>8} {'reader_MB/s':>12}")
+    for name, request, count, legacy in cases:
+        reader_us = measure(run_reader, request, count)
+        if legacy:
+            legacy_us = measure(run_legacy, request, count)
+            legacy_col = f"{legacy_us:10.1f}"
+            speedup_col = f"{legacy_us / reader_us:7.1f}x"
+        else:
+            legacy_col = f"{'-':>10}"
+            speedup_col = f"{'-':>8}"
+        print(f"{name:>12} {len(request):9d} {legacy_col} {reader_us:10.1f} {speedup_col} "
+              f"{len(request) / reader_us:12.1f}")
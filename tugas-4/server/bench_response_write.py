@@ -0,0 +1,101 @@
+import argparse
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+
+from http import HttpServer
+
+"""
+* micro-benchmark biaya penulisan satu response lewat socket sungguhan
+(socketpair), termasuk biaya system call send:
+  - legacy : cara lama (header disusun dengan format berulang, di-encode,
+             digabung dengan header Connection dan body, lalu sendall)
+  - buffers: HttpServer.response + HttpResponse.send (list buffer, satu sendmsg)
+
+* sebuah thread menguras sisi penerima, yang diukur adalah waktu sampai
+--count response terkirim dan diterima seluruhnya
+"""
+
+HEADERS = {
+    'Content-Type': 'text/html',
+    'ETag': '"1a2b3c-86626-17f0c2a9b1d2e3f4"',
+    'Last-Modified': 'Sun, 18 Oct 2026 10:00:00 GMT',
+    'Accept-Ranges': 'bytes',
+    'Cache-Control': 'no-cache',
+}
+
+
+def run_legacy(connection, body, count):
+    for _ in range(count):
+        tanggal = datetime.now().strftime('%c')
+        resp = []
+        resp.append("HTTP/1.1 {} {}\r\n" . format(200, 'OK'))
+        resp.append("Date: {}\r\n" . format(tanggal))
+        resp.append("Server: myserver/1.0\r\n")
+        resp.append("Content-Length: {}\r\n" . format(len(body)))
+        for kk in HEADERS:
+            resp.append("{}:{}\r\n" . format(kk, HEADERS[kk]))
+        response_headers = ''
+        for i in resp:
+            response_headers = "{}{}" . format(response_headers, i)
+        head = response_headers.encode()
+        connection.sendall(head + "Connection: {}\r\n\r\n".format('keep-alive').encode() + body)
+
+
+def run_buffers(connection, body, count):
+    httpserver = HttpServer()
+    for _ in range(count):
+        response = httpserver.response(200, 'OK', body, HEADERS)
+        response.keep_alive = True
+        response.send(connection)
+
+
+def drain(connection, received):
+    buffer = bytearray(1048576)
+    while n := connection.recv_into(buffer):
+        received[0] += n
+
+
+def measure_once(runner, body, count):
+    sender, receiver = socket.socketpair()
+    received = [0]
+    reader = threading.Thread(target=drain, args=(receiver, received))
+    reader.start()
+    start = time.perf_counter()
+    runner(sender, body, count)
+    sender.shutdown(socket.SHUT_WR)
+    reader.join()
+    duration = time.perf_counter() - start
+    sender.close()
+    receiver.close()
+    return duration / count * 1e6, received[0] // count
+
+
+def measure(runners, body, count, repeat):
+    # hasil terbaik dari beberapa kali pengukuran, mengurangi gangguan scheduler.
+    # runner diukur bergantian agar urutan tidak menguntungkan salah satunya
+    results = [[] for _ in runners]
+    for _ in range(repeat):
+        for runner, result in zip(runners, results):
+            result.append(measure_once(runner, body, count))
+    return [min(result) for result in results]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='HTTP response write micro-benchmark')
+    parser.add_argument('--count', type=int, default=20000, help='Responses per measurement')
+    parser.add_argument('--repeat', type=int, default=5, help='Measurements per case, best is reported')
+    parser.add_argument('--body-kb', type=int, nargs='+', default=[0, 1, 64, 1024],
+                        help='Response body sizes in KB (default: 0 1 64 1024)')
+    args = parser.parse_args()
+
+    print(f"{'body':>8} {'bytes':>9} {'legacy_us':>10} {'buffers_us':>11} {'speedup':>8}")
+    for body_kb in args.body_kb:
+        body = os.urandom(body_kb * 1024)
+        # response besar diulang lebih sedikit agar waktu total tetap wajar
+        count = max(10, args.count // max(body_kb, 1))
+        (legacy_us, size), (buffers_us, _) = measure([run_legacy, run_buffers], body, count, args.repeat)
+        print(f"{body_kb:6d}KB {size:9d} {legacy_us:10.1f} {buffers_us:11.1f} "
+              f"{legacy_us / buffers_us:7.2f}x")
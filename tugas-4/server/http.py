@@ -1,10 +1,160 @@
+import hashlib
+import json
+import mmap
 import os.path
-from datetime import datetime
+import secrets
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+
+from metadata_index import MetadataIndex
+from multipart import MultipartParser, multipart_boundary
+from request_reader import RequestError
+from response_cache import ResponseCache
+from scatter_write import sendmsg_all
+from single_flight import SingleFlight
 
 bad_request = 'Bad Request'
 not_found = 'Not Found'
 internal_server_error = 'Internal Server Error'
 text_plain = 'text/plain'
+files_dir = '../files'
+
+# jumlah range maksimum dalam satu request, lebih dari ini Range diabaikan
+max_ranges = 16
+
+# Content-Encoding yang didukung -> wbits zlib (31: format gzip, 15: format zlib untuk "deflate")
+content_encodings = {'gzip': 31, 'deflate': 15}
+# file teks yang lebih besar dari ini dikirim tanpa kompresi
+max_compress_bytes = 16 * 1024 * 1024
+compress_level = 6
+# file yang lebih besar dari ini dibaca lewat mmap (kompresi, hash ETag, kirim tanpa sendfile)
+mmap_threshold = 1024 * 1024
+connection_headers = {True: b"Connection: keep-alive\r\n\r\n", False: b"Connection: close\r\n\r\n"}
+
+
+def map_file(fileobj, size):
+    """Isi file sebagai mmap read-only, None jika lebih kecil dari mmap_threshold.
+    halaman file dipakai langsung dari page cache (bersama semua request),
+    tidak disalin ke bytes baru. file di folder files tidak pernah ditulis
+    di tempat (upload menulis file sementara lalu os.replace)"""
+    if size == 0 or size < mmap_threshold:
+        return None
+    return mmap.mmap(fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def read_chunks(fileobj, offset, count, chunk_size=1048576):
+    """Producer isi file: menghasilkan potongan bytes dari offset sepanjang count"""
+    fileobj.seek(offset)
+    remaining = count
+    while remaining > 0:
+        chunk = fileobj.read(min(chunk_size, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
+
+
+class HttpResponse:
+    """Response HTTP yang siap dikirim: header berupa bytes, body berupa
+    bytes, daftar segmen, atau producer (iterable potongan bytes).
+    segmen berupa bytes dikirim apa adanya, segmen berupa (offset, count)
+    diambil dari fileobj dengan socket.sendfile()
+
+    response disusun sebagai list buffer (header, header Connection, body,
+    segmen) yang dikirim dengan sendmsg_all, body tidak disalin untuk
+    digabung dengan header
+
+    body dari producer tidak diketahui panjangnya: ke client HTTP/1.1
+    dikirim dengan Transfer-Encoding: chunked, ke client HTTP/1.0 dikirim
+    apa adanya dan diakhiri dengan menutup koneksi
+
+    header Connection baru ditambahkan saat dikirim, sesuai keep_alive
+    yang ditentukan dari request dan batas koneksi di server"""
+
+    chunk_size = 1048576
+    # potongan kecil dari producer dikumpulkan dulu agar tidak satu send per baris
+    stream_buffer_size = 16384
+
+    def __init__(self, head, body=b'', fileobj=None, segments=(), chunks=None):
+        self.head = head
+        self.body = body
+        self.fileobj = fileobj
+        self.segments = segments
+        self.chunks = chunks
+        self.chunked = False
+        self.keep_alive = False
+
+    def header_buffers(self):
+        buffers = [self.head]
+        if self.chunks is not None and self.chunked:
+            buffers.append(b"Transfer-Encoding: chunked\r\n")
+        buffers.append(connection_headers[bool(self.keep_alive)])
+        return buffers
+
+    def send(self, connection):
+        try:
+            if self.chunks is not None:
+                sendmsg_all(connection, self.header_buffers())
+                self._send_chunks(connection)
+                return
+            if self.fileobj is None:
+                sendmsg_all(connection, self.header_buffers() + [self.body])
+                return
+            # header dan segmen bytes di antara dua segmen file dikirim dalam satu sendmsg
+            pending = self.header_buffers()
+            for segment in self.segments:
+                if isinstance(segment, bytes):
+                    pending.append(segment)
+                else:
+                    sendmsg_all(connection, pending)
+                    pending = []
+                    self._send_file(connection, *segment)
+            sendmsg_all(connection, pending)
+        finally:
+            self.close()
+
+    def _send_chunks(self, connection):
+        pending = bytearray()
+        for data in self.chunks:
+            pending += data.encode() if isinstance(data, str) else data
+            if len(pending) >= self.stream_buffer_size:
+                sendmsg_all(connection, self._chunk_buffers(pending))
+                pending = bytearray()
+        # potongan terakhir dan penutup chunked dikirim bersama
+        buffers = self._chunk_buffers(pending) if pending else []
+        if self.chunked:
+            buffers.append(b"0\r\n\r\n")
+        sendmsg_all(connection, buffers)
+
+    def _chunk_buffers(self, data):
+        if self.chunked:
+            return [b"%x\r\n" % len(data), data, b"\r\n"]
+        return [data]
+
+    def _send_file(self, connection, offset, count):
+        if hasattr(connection, 'sendfile'):
+            # kernel yang menyalin isi file ke socket (zero-copy)
+            connection.sendfile(self.fileobj, offset, count)
+            return
+        mapped = map_file(self.fileobj, os.fstat(self.fileobj.fileno()).st_size)
+        if mapped is None:
+            for chunk in read_chunks(self.fileobj, offset, count, self.chunk_size):
+                connection.sendall(chunk)
+            return
+        with mapped, memoryview(mapped) as view:
+            for start in range(offset, offset + count, self.chunk_size):
+                connection.sendall(view[start:min(start + self.chunk_size, offset + count)])
+
+    def close(self):
+        if self.fileobj is not None:
+            self.fileobj.close()
+            self.fileobj = None
+        if hasattr(self.chunks, 'close'):
+            # menghentikan generator yang belum selesai (misalnya koneksi putus)
+            self.chunks.close()
 
 
 class HttpServer:
@@ -15,60 +165,225 @@ class HttpServer:
         self.types['.jpg'] = 'image/jpeg'
         self.types['.txt'] = text_plain
         self.types['.html'] = 'text/html'
-
-    def response(self, kode=404, message=not_found, messagebody=bytes(), headers={}):
+        # request bersamaan yang butuh hash ETag file yang sama cukup dihitung sekali
+        self.inflight = SingleFlight()
+        # True: ETag dari hash isi file (sha256), False: dari inode/size/mtime
+        self.etag_content_hash = False
+        # hash isi per path dan versi file, dibatasi seperti cache lainnya (LRU),
+        # 64 byte per hash sehingga muat sekitar 65 ribu file
+        self.etag_hashes = ResponseCache(4 * 1024 * 1024)
+        # hasil kompresi file statis, dicatat bersama versi file (size, mtime, inode)
+        self.compressed = ResponseCache(64 * 1024 * 1024)
+        self.compression_lock = threading.Lock()
+        self.compression = dict(bytes_in=0, bytes_out=0, cpu_seconds=0.0)
+        # listing folder files dilayani dari index metadata, bukan scandir + stat per request
+        # index tidak memuat file tersembunyi (diawali titik), termasuk folder .uploads
+        # berisi file sementara upload, sehingga /list/files tidak lagi menampilkan dotfile
+        self.index = MetadataIndex(files_dir)
+
+    def response_head(self, kode, message, content_length, headers={}):
         tanggal = datetime.now().strftime('%c')
         resp = []
-        resp.append("HTTP/1.0 {} {}\r\n" . format(kode, message))
+        resp.append("HTTP/1.1 {} {}\r\n" . format(kode, message))
         resp.append("Date: {}\r\n" . format(tanggal))
-        resp.append("Connection: close\r\n")
         resp.append("Server: myserver/1.0\r\n")
-        resp.append("Content-Length: {}\r\n" . format(len(messagebody)))
+        if content_length is not None:
+            resp.append("Content-Length: {}\r\n" . format(content_length))
         for kk in headers:
             resp.append("{}:{}\r\n" . format(kk, headers[kk]))
-        resp.append("\r\n")
+        # header Connection dan baris kosong penutup ditambahkan oleh HttpResponse
+        return ''.join(resp).encode()
+
+    def response(self, kode=404, message=not_found, messagebody=bytes(), headers={}):
+        # message body berupa producer dikirim bertahap tanpa Content-Length
+        if not isinstance(messagebody, (bytes, str)):
+            head = self.response_head(kode, message, None, headers)
+            return HttpResponse(head, chunks=messagebody)
 
-        response_headers = ''
-        for i in resp:
-            response_headers = "{}{}" . format(response_headers, i)
-        # menggabungkan resp menjadi satu string dan menggabungkan dengan messagebody yang berupa bytes
-        # response harus berupa bytes
         # message body harus diubah dulu menjadi bytes
         if (type(messagebody) is not bytes):
             messagebody = messagebody.encode()
 
-        response = response_headers.encode() + messagebody
-        # response adalah bytes
-        return response
-
-    def proses(self, data):
-        # Split by double CRLF to separate headers from body
-        parts = data.split("\r\n\r\n", 1)
-        header_part = parts[0]
-        body_part = parts[1] if len(parts) > 1 else ""
-
-        requests = header_part.split("\r\n")
-        baris = requests[0]
-        all_headers = [n for n in requests[1:] if n != '']
-
-        j = baris.split(" ")
-        try:
-            method = j[0].upper().strip()
-            if (method == 'GET'):
-                object_address = j[1].strip()
-                return self.http_get(object_address)
-            if (method == 'POST'):
-                object_address = j[1].strip()
-                return self.http_post(object_address, all_headers, body_part)
-            if (method == 'DELETE'):
-                object_address = j[1].strip()
-                return self.http_delete(object_address)
-            else:
-                return self.response(400, bad_request, '', {})
-        except IndexError:
+        # 304 tidak membawa body, Content-Length tidak dikirim
+        content_length = None if kode == 304 else len(messagebody)
+        head = self.response_head(kode, message, content_length, headers)
+        return HttpResponse(head, messagebody)
+
+    def file_response(self, kode, message, fileobj, headers={}, ranges=None):
+        # isi file tidak dibaca ke memori, dikirim langsung dari file saat send()
+        size = os.fstat(fileobj.fileno()).st_size
+        if not ranges:
+            head = self.response_head(kode, message, size, headers)
+            return HttpResponse(head, fileobj=fileobj, segments=[(0, size)])
+
+        if len(ranges) == 1:
+            start, end = ranges[0]
+            headers = dict(headers)
+            headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+            head = self.response_head(206, 'Partial Content', end - start + 1, headers)
+            return HttpResponse(head, fileobj=fileobj, segments=[(start, end - start + 1)])
+
+        # beberapa range dikirim sebagai multipart/byteranges
+        boundary = secrets.token_hex(16)
+        content_type = headers.get('Content-Type', 'application/octet-stream')
+        segments = []
+        for start, end in ranges:
+            segments.append((f"--{boundary}\r\n"
+                             f"Content-Type: {content_type}\r\n"
+                             f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n").encode())
+            segments.append((start, end - start + 1))
+            segments.append(b"\r\n")
+        segments.append(f"--{boundary}--\r\n".encode())
+        content_length = sum(len(x) if isinstance(x, bytes) else x[1] for x in segments)
+
+        headers = {k: v for k, v in headers.items() if k != 'Content-Type'}
+        headers['Content-Type'] = f'multipart/byteranges; boundary={boundary}'
+        head = self.response_head(206, 'Partial Content', content_length, headers)
+        return HttpResponse(head, fileobj=fileobj, segments=segments)
+
+    def proses(self, request, keep_alive=False):
+        """request: HttpRequest dari RequestReader.
+        keep_alive=False: server akan menutup koneksi setelah response ini"""
+        hasil = self.dispatch(request)
+        hasil.keep_alive = keep_alive and self.keep_alive_requested(request.version, request.headers)
+        hasil.chunked = request.version == 'HTTP/1.1'
+        if hasil.chunks is not None and not hasil.chunked:
+            # tanpa chunked, akhir body ditandai dengan menutup koneksi
+            hasil.keep_alive = False
+        return hasil
+
+    def dispatch(self, request):
+        method = request.method
+        object_address = request.target
+        if (method == 'GET'):
+            return self.http_get(object_address, request.headers)
+        if (method == 'POST'):
+            return self.http_post(object_address, request.headers, request.body)
+        if (method == 'DELETE'):
+            return self.http_delete(object_address)
+        else:
             return self.response(400, bad_request, '', {})
 
-    def http_get(self, object_address):
+    def keep_alive_requested(self, version, headers):
+        """HTTP/1.1 persistent kecuali Connection: close, HTTP/1.0 hanya jika Connection: keep-alive"""
+        connection = (self.header_value(headers, 'Connection') or '').lower()
+        tokens = [token.strip() for token in connection.split(',')]
+        if version == 'HTTP/1.1':
+            return 'close' not in tokens
+        return 'keep-alive' in tokens
+
+    def header_value(self, headers, name):
+        # nama header di HttpRequest.headers sudah huruf kecil
+        return headers.get(name.lower())
+
+    def validators(self, filepath, fileobj):
+        """ETag dan Last-Modified dari file yang sudah terbuka"""
+        st = os.fstat(fileobj.fileno())
+        version = (st.st_ino, st.st_size, st.st_mtime_ns)
+        if self.etag_content_hash:
+            etag = self.content_hash(filepath, fileobj, version)
+        else:
+            etag = '{:x}-{:x}-{:x}'.format(*version)
+        return {
+            'ETag': f'"{etag}"',
+            'Last-Modified': formatdate(st.st_mtime, usegmt=True),
+        }
+
+    def content_hash(self, filepath, fileobj, version):
+        key = os.path.abspath(filepath)
+        cached = self.etag_hashes.get(key, version)
+        if cached is not None:
+            return cached
+
+        def compute():
+            mapped = map_file(fileobj, version[1])
+            if mapped is not None:
+                with mapped:
+                    return hashlib.sha256(mapped).hexdigest()
+            # pread tidak menggeser posisi file yang nanti dikirim dengan sendfile
+            digest = hashlib.sha256()
+            offset = 0
+            while chunk := os.pread(fileobj.fileno(), 1048576, offset):
+                digest.update(chunk)
+                offset += len(chunk)
+            return digest.hexdigest()
+
+        etag = self.inflight.do(('etag', key, version), compute)
+        self.etag_hashes.put(key, version, etag)
+        return etag
+
+    def not_modified(self, headers, validators):
+        """True jika salinan milik client masih sama (If-None-Match / If-Modified-Since)"""
+        if_none_match = self.header_value(headers, 'If-None-Match')
+        if if_none_match is not None:
+            if if_none_match.strip() == '*':
+                return True
+            # perbandingan lemah: awalan W/ diabaikan
+            tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+            return validators['ETag'] in tags
+        if_modified_since = self.header_value(headers, 'If-Modified-Since')
+        if if_modified_since is not None:
+            since = self.parse_http_date(if_modified_since)
+            modified = self.parse_http_date(validators['Last-Modified'])
+            # tanggal yang tidak valid diabaikan (RFC 9110)
+            if since is None or modified is None:
+                return False
+            return modified <= since
+        return False
+
+    def parse_http_date(self, value):
+        """Tanggal HTTP sebagai datetime UTC (aware), None jika tidak valid.
+        zona -0000 menghasilkan datetime naive, dianggap UTC"""
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed
+
+    def parse_range(self, range_header, size):
+        """Mengubah header Range menjadi list (start, end) inklusif.
+        None jika header tidak valid (diabaikan), [] jika tidak ada range yang dapat dipenuhi"""
+        unit, _, spec = range_header.partition('=')
+        if unit.strip().lower() != 'bytes' or not spec:
+            return None
+        ranges = []
+        for part in spec.split(','):
+            first, dash, last = part.strip().partition('-')
+            if not dash:
+                return None
+            try:
+                if first == '':
+                    # suffix range: N byte terakhir
+                    length = int(last)
+                    if length == 0:
+                        continue
+                    start, end = max(size - length, 0), size - 1
+                else:
+                    start = int(first)
+                    end = int(last) if last else size - 1
+                    if last and end < start:
+                        return None
+                    end = min(end, size - 1)
+            except ValueError:
+                return None
+            if start < size:
+                ranges.append((start, end))
+        if len(ranges) > max_ranges:
+            return None
+        return ranges
+
+    def if_range_matches(self, headers, validators):
+        """If-Range cocok jika ETag sama persis (strong) atau tanggal sama dengan Last-Modified"""
+        if_range = self.header_value(headers, 'If-Range')
+        if if_range is None:
+            return True
+        if if_range.startswith('"'):
+            return if_range == validators['ETag']
+        return if_range == validators['Last-Modified']
+
+    def http_get(self, object_address, request_headers={}):
         base_dir = '../'  # This is where all actual files are stored
 
         # Static routes
@@ -78,6 +393,8 @@ class HttpServer:
             return self.response(302, 'Found', '', dict(location='https://youtu.be/katoxpnTf04'))
         if object_address == '/santai':
             return self.response(200, 'OK', 'santai saja', dict())
+        if object_address == '/stats':
+            return self.response(200, 'OK', json.dumps(self.stats()), {'Content-Type': 'application/json'})
         if object_address.startswith('/list'):
             # Extract subdirectory name after /list/
             subdir = object_address[6:].lstrip(
@@ -88,7 +405,7 @@ class HttpServer:
             if not os.path.abspath(target_path).startswith(os.path.abspath(base_dir)):
                 return self.response(403, 'Forbidden', 'Invalid directory path', {})
 
-            return self.list_directory(target_path)
+            return self.list_directory(target_path, request_headers)
 
         # Remove leading slash
         object_address = object_address.lstrip('/')
@@ -102,49 +419,200 @@ class HttpServer:
 
         # If it's a directory, list contents
         if os.path.isdir(filepath):
-            return self.list_directory(filepath)
+            return self.list_directory(filepath, request_headers)
 
-        # Try to read and serve the file
+        # Try to open and serve the file
+        fp = None
         try:
-            with open(filepath, 'rb') as fp:
-                isi = fp.read()
+            fp = open(filepath, 'rb')
 
             # Determine content type
             fext = os.path.splitext(filepath)[1]
             content_type = self.types.get(fext, 'application/octet-stream')
 
+            validators = self.validators(filepath, fp)
+            compressible = self.compressible(content_type)
+            compressed = None
+            if compressible and self.header_value(request_headers, 'Range') is None:
+                compressed = self.compressed_file(filepath, fp, request_headers)
+            if compressed is not None:
+                encoding, compressed_body = compressed
+                # representasi terkompresi punya ETag sendiri
+                validators['ETag'] = '{}-{}"'.format(validators['ETag'][:-1], encoding)
+
+            if self.not_modified(request_headers, validators):
+                fp.close()
+                if compressible:
+                    validators['Vary'] = 'Accept-Encoding'
+                return self.response(304, 'Not Modified', '', validators)
+
             headers = {
                 'Content-Type': content_type,
                 # download hint
                 'Content-Disposition': f'attachment; filename="{object_address}"'
             }
-
-            return self.response(200, 'OK', isi, headers)
+            headers.update(validators)
+            headers['Accept-Ranges'] = 'bytes'
+            if compressible:
+                headers['Vary'] = 'Accept-Encoding'
+            if compressed is not None:
+                fp.close()
+                headers['Content-Encoding'] = encoding
+                return self.response(200, 'OK', compressed_body, headers)
+
+            ranges = None
+            range_header = self.header_value(request_headers, 'Range')
+            if range_header is not None and self.if_range_matches(request_headers, validators):
+                size = os.fstat(fp.fileno()).st_size
+                ranges = self.parse_range(range_header, size)
+                if ranges == []:
+                    fp.close()
+                    return self.response(416, 'Range Not Satisfiable', '', {'Content-Range': f'bytes */{size}'})
+
+            return self.file_response(200, 'OK', fp, headers, ranges)
         except Exception as e:
+            if fp is not None:
+                fp.close()
             return self.response(500, internal_server_error, f'Error reading file: {str(e)}', {})
 
-    def list_directory(self, directory_path):
-        """List files in directory"""
+    def list_directory(self, directory_path, request_headers={}):
+        """List files in directory, dikirim bertahap per baris"""
         try:
-            files = os.listdir(directory_path)
-            output_lines = [f"Directory listing: {directory_path}", ""]
-
-            for file in sorted(files):
-                file_path = os.path.join(directory_path, file)
-                if os.path.isdir(file_path):
-                    output_lines.append(f"[DIR]  {file}/")
-                else:
-                    file_size = os.path.getsize(file_path)
-                    output_lines.append(f"[FILE] {file}  ({file_size} bytes)")
-
-            output_text = "\n".join(output_lines)
-
-            headers = {'Content-type': text_plain}
-            return self.response(200, 'OK', output_text, headers)
+            if os.path.abspath(directory_path) == os.path.abspath(files_dir):
+                # thread reconcile dijalankan di proses yang melayani request,
+                # worker hasil fork tidak membawa thread milik proses induk
+                self.index.start()
+                body = self.render_index_listing(directory_path, self.index.listing())
+            else:
+                # direktori dibaca di sini agar error masih bisa dijawab dengan 500
+                with os.scandir(directory_path) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+                body = self.render_listing(directory_path, entries)
+            headers = {'Content-type': text_plain, 'Vary': 'Accept-Encoding'}
+            encoding = self.negotiate_encoding(request_headers)
+            if encoding is not None:
+                body = self.compress_chunks(body, encoding)
+                headers['Content-Encoding'] = encoding
+            return self.response(200, 'OK', body, headers)
 
         except Exception as e:
             return self.response(500, internal_server_error, f'Error listing directory: {str(e)}', {})
 
+    def render_listing(self, directory_path, entries):
+        """Producer isi listing, ukuran file di-stat saat barisnya akan dikirim"""
+        yield f"Directory listing: {directory_path}\n".encode()
+
+        for entry in entries:
+            try:
+                if entry.is_dir():
+                    line = self.listing_line(entry.name, True)
+                else:
+                    line = self.listing_line(entry.name, False, entry.stat().st_size)
+            except OSError:
+                # file dihapus setelah direktori dibaca
+                continue
+            yield f"\n{line}".encode()
+
+    def render_index_listing(self, directory_path, entries):
+        """Producer isi listing dari index metadata, tanpa system call per file"""
+        yield f"Directory listing: {directory_path}\n".encode()
+
+        for entry in entries:
+            yield f"\n{self.listing_line(entry.name, entry.type == 'dir', entry.size)}".encode()
+
+    def listing_line(self, name, is_dir, size=0):
+        if is_dir:
+            return f"[DIR]  {name}/"
+        return f"[FILE] {name}  ({size} bytes)"
+
+    def compressible(self, content_type):
+        # jpg, pdf, dan sejenisnya sudah terkompresi, yang dikompres hanya teks
+        return content_type.startswith('text/')
+
+    def negotiate_encoding(self, headers):
+        """Memilih gzip/deflate dari Accept-Encoding sesuai q-value, None berarti tanpa kompresi"""
+        accept = self.header_value(headers, 'Accept-Encoding')
+        if not accept:
+            return None
+        best, best_q = None, 0.0
+        for item in accept.split(','):
+            name, _, params = item.partition(';')
+            name = name.strip().lower()
+            q = 1.0
+            for param in params.split(';'):
+                key, _, value = param.strip().partition('=')
+                if key == 'q':
+                    try:
+                        q = float(value)
+                    except ValueError:
+                        q = 0.0
+            for encoding in (content_encodings if name == '*' else [name]):
+                if encoding in content_encodings and q > best_q:
+                    best, best_q = encoding, q
+        return best
+
+    def compressed_file(self, filepath, fileobj, request_headers):
+        """(encoding, isi terkompresi) dari cache, dikompres sekali per versi file.
+        None jika client tidak menerima kompresi atau hasilnya tidak lebih kecil"""
+        st = os.fstat(fileobj.fileno())
+        if st.st_size > max_compress_bytes:
+            return None
+        encoding = self.negotiate_encoding(request_headers)
+        if encoding is None:
+            return None
+
+        version = (st.st_size, st.st_mtime_ns, st.st_ino)
+        # varian disimpan seperti file pra-kompresi: <nama>.gzip / <nama>.deflate
+        variant = f'{filepath}.{encoding}'
+        data = self.compressed.get(variant, version)
+        if data is None:
+            def compute():
+                mapped = map_file(fileobj, st.st_size)
+                if mapped is None:
+                    # pread tidak menggeser posisi file
+                    return self.compress(os.pread(fileobj.fileno(), st.st_size, 0), encoding)
+                with mapped:
+                    return self.compress(mapped, encoding)
+
+            key = ('compress', os.path.abspath(filepath), version, encoding)
+            data = self.inflight.do(key, compute)
+            self.compressed.put(variant, version, data)
+        if len(data) >= st.st_size:
+            return None
+        return encoding, data
+
+    def compress(self, data, encoding):
+        compressor = zlib.compressobj(compress_level, zlib.DEFLATED, content_encodings[encoding])
+        start = time.thread_time()
+        out = compressor.compress(data) + compressor.flush()
+        self.record_compression(len(data), len(out), time.thread_time() - start)
+        return out
+
+    def compress_chunks(self, chunks, encoding):
+        """Producer terkompresi dari producer lain, dipakai untuk listing"""
+        compressor = zlib.compressobj(compress_level, zlib.DEFLATED, content_encodings[encoding])
+        for chunk in chunks:
+            start = time.thread_time()
+            out = compressor.compress(chunk)
+            self.record_compression(len(chunk), len(out), time.thread_time() - start)
+            if out:
+                yield out
+        start = time.thread_time()
+        out = compressor.flush()
+        self.record_compression(0, len(out), time.thread_time() - start)
+        yield out
+
+    def record_compression(self, bytes_in, bytes_out, seconds):
+        with self.compression_lock:
+            self.compression['bytes_in'] += bytes_in
+            self.compression['bytes_out'] += bytes_out
+            self.compression['cpu_seconds'] += seconds
+
+    def stats(self):
+        with self.compression_lock:
+            compression = dict(self.compression)
+        return dict(compression=compression, compressed_cache=self.compressed.stats())
+
     def http_post(self, object_address, headers, body):
         """Enhanced POST method with file upload capability"""
 
@@ -157,60 +625,48 @@ class HttpServer:
         isi = "POST request received"
         return self.response(200, 'OK', isi, headers_dict)
 
+    def open_body(self, method, target, headers):
+        """Dipanggil RequestReader setelah header diterima. body upload multipart
+        diparse sambil diterima dan filenya langsung ditulis ke files/"""
+        if method == 'POST' and target == '/upload':
+            boundary = multipart_boundary(self.header_value(headers, 'Content-Type'))
+            if boundary:
+                return MultipartParser(boundary, files_dir)
+        return None
+
     def handle_file_upload(self, headers, body):
-        """NEW FEATURE: Handle file upload via POST"""
+        """Handle file upload via POST, body berupa MultipartParser yang sudah selesai
+        (dari open_body) atau bytes jika request tidak dibaca lewat RequestReader"""
+        parser = body
         try:
-            # Extract Content-Type and boundary
-            content_type = None
-            for header in headers:
-                if header.lower().startswith('content-type:'):
-                    content_type = header.split(':', 1)[1].strip()
-                    break
-
+            content_type = self.header_value(headers, 'Content-Type')
             if not content_type or 'multipart/form-data' not in content_type:
                 return self.response(400, bad_request, 'Content-Type must be multipart/form-data', {})
 
-            boundary = None
-            if 'boundary=' in content_type:
-                boundary = content_type.split('boundary=')[1].strip()
-
+            boundary = multipart_boundary(content_type)
             if not boundary:
                 return self.response(400, bad_request, 'Missing boundary in multipart data', {})
 
-            boundary_bytes = ('--' + boundary).encode()
-            parts = body.encode('latin1').split(boundary_bytes)
-
-            for part in parts:
-                if b'Content-Disposition: form-data' in part and b'filename=' in part:
-                    # Extract filename
-                    lines = part.split(b'\r\n')
-                    filename = None
-                    for line in lines:
-                        if b'filename=' in line:
-                            line_str = line.decode(errors='ignore')
-                            filename = line_str.split('filename="')[
-                                1].split('"')[0]
-                            break
-
-                    if filename:
-                        # Extract the file content
-                        content_start = part.find(b'\r\n\r\n')
-                        if content_start != -1:
-                            file_content = part[content_start + 4:]
-                            file_content = file_content.rstrip(b'\r\n--')
-
-                            # Save file to files/ directory
-                            os.makedirs('../files', exist_ok=True)
-                            save_path = os.path.join('../files', filename)
-                            with open(save_path, 'wb') as f:
-                                f.write(file_content)
-
-                            success_msg = f'File "{filename}" uploaded successfully to /files ({len(file_content)} bytes)'
-                            return self.response(200, 'OK', success_msg, {'Content-Type': text_plain})
-
-            return self.response(400, bad_request, 'No file found in upload data', {})
+            if isinstance(body, bytes):
+                parser = MultipartParser(boundary, files_dir)
+                parser.feed(body)
+                parser.finish()
+
+            if not parser.files:
+                return self.response(400, bad_request, 'No file found in upload data', {})
+            for filename, size in parser.files:
+                self.etag_hashes.invalidate(os.path.join(files_dir, filename))
+                self.index.update(filename)
+
+            lines = [f'File "{filename}" uploaded successfully to /files ({size} bytes)'
+                     for filename, size in parser.files]
+            return self.response(200, 'OK', '\n'.join(lines), {'Content-Type': text_plain})
 
+        except RequestError as e:
+            return self.response(e.status, e.reason, str(e), {'Content-Type': text_plain})
         except Exception as e:
+            if isinstance(parser, MultipartParser):
+                parser.abort()
             return self.response(500, internal_server_error, f'Upload error: {str(e)}', {'Content-Type': text_plain})
 
     def http_delete(self, object_address):
@@ -236,6 +692,8 @@ class HttpServer:
                 return self.response(403, 'Forbidden', 'Cannot delete directories', {})
 
             os.remove(file_path)
+            self.etag_hashes.invalidate(file_path)
+            self.index.remove(filename)
             success_msg = f'File "{filename}" deleted successfully'
             return self.response(200, 'OK', success_msg, {})
 
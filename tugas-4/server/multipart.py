@@ -0,0 +1,205 @@
+import os
+import tempfile
+
+from request_reader import RequestError
+
+"""
+* class MultipartParser mem-parse body multipart/form-data secara bertahap:
+data diberikan per potongan lewat feed(), batas (boundary) dicari juga di
+sambungan antar potongan, dan isi setiap file langsung ditulis ke file
+sementara di subfolder .uploads direktori tujuan
+
+* memori yang dipakai tetap sebesar potongan yang diterima ditambah
+panjang boundary, berapa pun ukuran upload. field biasa (bukan file)
+disimpan di memori dengan batas max_field_bytes
+
+* file baru dipindahkan ke nama aslinya (os.replace) setelah boundary
+penutup diterima, jika request terputus atau melewati batas semua file
+sementara dihapus
+"""
+
+CRLF = b'\r\n'
+HEADER_END = b'\r\n\r\n'
+# subfolder di dalam direktori tujuan, tempat file sementara upload ditulis
+UPLOAD_DIR = '.uploads'
+
+
+def current_umask():
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# mode file hasil upload, sama seperti file yang dibuat dengan open() biasa
+FILE_MODE = 0o666 & ~current_umask()
+
+
+def multipart_boundary(content_type):
+    """Mengambil boundary dari header Content-Type multipart/form-data, None jika tidak ada"""
+    if not content_type or 'multipart/form-data' not in content_type.lower():
+        return None
+    for param in content_type.split(';')[1:]:
+        key, _, value = param.strip().partition('=')
+        if key.strip().lower() == 'boundary':
+            return value.strip().strip('"') or None
+    return None
+
+
+def header_params(value):
+    """'form-data; name="file"; filename="a.txt"' -> {'name': 'file', 'filename': 'a.txt'}"""
+    params = {}
+    for param in value.split(';')[1:]:
+        key, _, val = param.strip().partition('=')
+        params[key.strip().lower()] = val.strip().strip('"')
+    return params
+
+
+class MultipartParser:
+    max_part_header_bytes = 16384
+    max_field_bytes = 65536
+
+    def __init__(self, boundary, directory, max_file_bytes=1024 * 1024 * 1024, max_parts=100):
+        self.delimiter = b'--' + boundary.encode('latin1')
+        # di dalam body, boundary selalu didahului CRLF milik baris sebelumnya
+        self.body_delimiter = CRLF + self.delimiter
+        self.directory = directory
+        self.max_file_bytes = max_file_bytes
+        self.max_parts = max_parts
+        self.buffer = bytearray()
+        self.state = 'preamble'
+        self.parts = 0
+        self.part = None
+        # file yang sudah lengkap: (nama file, path sementara, ukuran)
+        self.completed = []
+        self.files = []
+        self.fields = {}
+
+    def feed(self, data):
+        self.buffer += data
+        while self._step():
+            pass
+
+    def _step(self):
+        """Memproses buffer sejauh mungkin, False jika perlu data tambahan"""
+        if self.state == 'preamble':
+            index = self.buffer.find(self.delimiter)
+            if index == -1:
+                # sisakan bagian yang mungkin awal dari boundary
+                del self.buffer[:max(0, len(self.buffer) - len(self.delimiter) + 1)]
+                return False
+            del self.buffer[:index + len(self.delimiter)]
+            self.state = 'delimiter'
+            return True
+
+        if self.state == 'delimiter':
+            if len(self.buffer) < 2:
+                return False
+            if self.buffer[:2] == b'--':
+                self.state = 'epilogue'
+                return True
+            if self.buffer[:2] != CRLF:
+                raise RequestError(400, 'Bad Request', 'Malformed multipart boundary')
+            del self.buffer[:2]
+            self.state = 'headers'
+            return True
+
+        if self.state == 'headers':
+            index = self.buffer.find(HEADER_END)
+            if index == -1:
+                if len(self.buffer) > self.max_part_header_bytes:
+                    raise RequestError(431, 'Request Header Fields Too Large', 'Multipart part header too large')
+                return False
+            headers = self.buffer[:index].decode('utf-8', errors='replace')
+            del self.buffer[:index + len(HEADER_END)]
+            self._start_part(headers)
+            self.state = 'body'
+            return True
+
+        if self.state == 'body':
+            index = self.buffer.find(self.body_delimiter)
+            if index == -1:
+                # isi yang pasti bukan bagian dari boundary bisa langsung ditulis
+                safe = len(self.buffer) - len(self.body_delimiter) + 1
+                if safe > 0:
+                    self._write_part(safe)
+                return False
+            self._write_part(index)
+            del self.buffer[:len(self.body_delimiter)]
+            self._finish_part()
+            self.state = 'delimiter'
+            return True
+
+        # epilogue setelah boundary penutup diabaikan
+        self.buffer.clear()
+        return False
+
+    def _start_part(self, headers):
+        self.parts += 1
+        if self.parts > self.max_parts:
+            raise RequestError(413, 'Content Too Large', 'Too many parts in multipart body')
+        disposition = {}
+        for line in headers.split('\r\n'):
+            key, _, value = line.partition(':')
+            if key.strip().lower() == 'content-disposition':
+                disposition = header_params(value)
+
+        filename = os.path.basename(disposition.get('filename', '').replace('\\', '/'))
+        if filename in ('', '.', '..'):
+            if 'filename' in disposition:
+                raise RequestError(400, 'Bad Request', 'Invalid filename in multipart part')
+            self.part = dict(name=disposition.get('name', ''), data=bytearray(), file=None, size=0)
+            return
+        # file sementara dibuat di subfolder tersembunyi (filesystem yang sama),
+        # agar upload yang sedang berjalan tidak mengubah mtime folder yang di-index
+        upload_dir = os.path.join(self.directory, UPLOAD_DIR)
+        os.makedirs(upload_dir, exist_ok=True)
+        tmp = tempfile.NamedTemporaryFile(dir=upload_dir, prefix='.upload-', delete=False)
+        # NamedTemporaryFile selalu 0600, file hasil upload harus tetap bisa dibaca
+        os.fchmod(tmp.fileno(), FILE_MODE)
+        self.part = dict(name=disposition.get('name', ''), filename=filename, file=tmp, size=0)
+
+    def _write_part(self, length):
+        part = self.part
+        part['size'] += length
+        if part['file'] is None:
+            if part['size'] > self.max_field_bytes:
+                raise RequestError(413, 'Content Too Large', 'Multipart field too large')
+            part['data'] += self.buffer[:length]
+        else:
+            if part['size'] > self.max_file_bytes:
+                raise RequestError(413, 'Content Too Large', 'Uploaded file too large')
+            with memoryview(self.buffer) as view:
+                part['file'].write(view[:length])
+        del self.buffer[:length]
+
+    def _finish_part(self):
+        part = self.part
+        self.part = None
+        if part['file'] is None:
+            self.fields[part['name']] = bytes(part['data'])
+            return
+        part['file'].close()
+        self.completed.append((part['filename'], part['file'].name, part['size']))
+
+    def finish(self):
+        """Dipanggil setelah seluruh body diterima: memindahkan file sementara ke nama aslinya"""
+        if self.state != 'epilogue':
+            self.abort()
+            raise RequestError(400, 'Bad Request', 'Incomplete multipart body')
+        for filename, tmp_path, size in self.completed:
+            os.replace(tmp_path, os.path.join(self.directory, filename))
+            self.files.append((filename, size))
+        self.completed = []
+        return self
+
+    def abort(self):
+        if self.part is not None and self.part['file'] is not None:
+            self.completed.append((None, self.part['file'].name, 0))
+            self.part['file'].close()
+        self.part = None
+        for filename, tmp_path, size in self.completed:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        self.completed = []
@@ -0,0 +1,228 @@
+from collections import namedtuple
+
+"""
+* class RequestReader mem-parse aliran bytes dari satu koneksi menjadi
+HttpRequest secara bertahap: request line dan header dibaca dengan batas
+ukuran, lalu body dibaca tepat sepanjang Content-Length atau didecode dari
+Transfer-Encoding: chunked
+
+* data dibaca dengan recv_into() ke buffer besar yang dipakai ulang, dan
+disimpan dalam satu bytearray. pencarian akhir header dilanjutkan dari
+posisi terakhir, jadi biaya parsing sebanding dengan ukuran request
+
+* karena batas request ditentukan dari header, beberapa request yang
+dikirim sekaligus (pipelining) dipisah dengan benar dan sisa data
+disimpan untuk request berikutnya
+
+* request yang tidak valid atau melewati batas menghasilkan RequestError
+berisi status HTTP yang harus dikirim sebelum koneksi ditutup
+
+* jika body_opener diberikan, fungsi itu dipanggil setelah header diterima.
+bila mengembalikan objek (misalnya MultipartParser), body tidak ditampung
+di memori tetapi diberikan per potongan ke feed() objek itu, lalu finish()
+dipanggil di akhir body dan hasilnya menjadi HttpRequest.body
+"""
+
+TERMINATOR = b'\r\n\r\n'
+CRLF = b'\r\n'
+
+# headers: dict dengan nama header huruf kecil, body: bytes (atau hasil body_opener)
+HttpRequest = namedtuple('HttpRequest', ['method', 'target', 'version', 'headers', 'body'])
+
+
+class RequestError(Exception):
+    def __init__(self, status, reason, message):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+
+
+class RequestReader:
+    recv_size = 65536
+    max_header_bytes = 65536
+    max_headers = 100
+    max_body_bytes = 1024 * 1024 * 1024
+
+    def __init__(self, body_opener=None):
+        self.body_opener = body_opener
+        self.sink = None
+        self.buffer = bytearray()
+        self.scan = 0
+        self.chunk = None
+        self.head = None
+        self.body = bytearray()
+        self.body_remaining = 0
+        self.chunked_state = None
+        self.chunked_total = 0
+
+    def recv_from(self, connection):
+        """Membaca dari socket langsung ke buffer, mengembalikan jumlah byte (0 jika koneksi ditutup)"""
+        if self.chunk is None:
+            # dialokasikan saat pertama dipakai, koneksi yang diam tidak memakan memori
+            self.chunk = bytearray(self.recv_size)
+        n = connection.recv_into(self.chunk)
+        if n:
+            with memoryview(self.chunk) as view:
+                self.buffer += view[:n]
+        return n
+
+    def feed(self, data):
+        self.buffer += data
+
+    def _consume(self, length):
+        del self.buffer[:length]
+        self.scan = 0
+
+    def next_request(self):
+        """Mengembalikan satu HttpRequest utuh, atau None jika datanya belum lengkap"""
+        if self.head is None and not self._read_head():
+            return None
+        if self.chunked_state is not None:
+            complete = self._read_chunked()
+        else:
+            complete = self._read_body()
+        if not complete:
+            return None
+
+        method, target, version, headers = self.head
+        if self.sink is not None:
+            sink = self.sink
+            self.sink = None
+            body = sink.finish()
+        else:
+            body = bytes(self.body)
+        request = HttpRequest(method, target, version, headers, body)
+        self.head = None
+        self.body = bytearray()
+        self.chunked_state = None
+        return request
+
+    def _read_head(self):
+        index = self.buffer.find(TERMINATOR, self.scan)
+        if index == -1:
+            if len(self.buffer) > self.max_header_bytes:
+                raise RequestError(431, 'Request Header Fields Too Large', 'Request header too large')
+            self.scan = max(0, len(self.buffer) - len(TERMINATOR) + 1)
+            return False
+        if index > self.max_header_bytes:
+            raise RequestError(431, 'Request Header Fields Too Large', 'Request header too large')
+
+        lines = self.buffer[:index].decode('latin1').split('\r\n')
+        self._consume(index + len(TERMINATOR))
+
+        request_line = lines[0].split(' ')
+        if len(request_line) != 3 or not request_line[2].startswith('HTTP/'):
+            raise RequestError(400, 'Bad Request', 'Malformed request line')
+        if len(lines) - 1 > self.max_headers:
+            raise RequestError(431, 'Request Header Fields Too Large', 'Too many header fields')
+
+        headers = {}
+        for line in lines[1:]:
+            key, colon, value = line.partition(':')
+            if not colon or not key.strip():
+                raise RequestError(400, 'Bad Request', 'Malformed header field')
+            key = key.strip().lower()
+            value = value.strip()
+            headers[key] = f'{headers[key]}, {value}' if key in headers else value
+
+        method, target, version = request_line
+        self.head = (method.upper(), target, version.upper(), headers)
+        if self.body_opener is not None:
+            self.sink = self.body_opener(method.upper(), target, headers)
+
+        transfer_encoding = headers.get('transfer-encoding')
+        if transfer_encoding is not None:
+            if transfer_encoding.lower() != 'chunked':
+                raise RequestError(501, 'Not Implemented', f'Transfer-Encoding {transfer_encoding} not supported')
+            self.chunked_state = 'size'
+            self.chunked_total = 0
+            return True
+
+        try:
+            self.body_remaining = int(headers.get('content-length', '0'))
+        except ValueError:
+            raise RequestError(400, 'Bad Request', 'Invalid Content-Length')
+        if self.body_remaining < 0:
+            raise RequestError(400, 'Bad Request', 'Invalid Content-Length')
+        if self.body_remaining > self.max_body_bytes:
+            raise RequestError(413, 'Content Too Large', 'Request body too large')
+        return True
+
+    def _take_body(self, length):
+        length = min(length, len(self.buffer))
+        if length:
+            with memoryview(self.buffer) as view:
+                if self.sink is not None:
+                    self.sink.feed(view[:length])
+                else:
+                    self.body += view[:length]
+            self._consume(length)
+        return length
+
+    def _read_body(self):
+        self.body_remaining -= self._take_body(self.body_remaining)
+        return self.body_remaining == 0
+
+    def _read_chunked(self):
+        """Decode Transfer-Encoding: chunked, state disimpan di antara pemanggilan"""
+        while True:
+            if self.chunked_state == 'size':
+                index = self.buffer.find(CRLF)
+                if index == -1:
+                    if len(self.buffer) > self.max_header_bytes:
+                        raise RequestError(400, 'Bad Request', 'Chunk size line too long')
+                    return False
+                # chunk extension setelah ';' diabaikan
+                size_field = bytes(self.buffer[:index]).split(b';', 1)[0].strip()
+                try:
+                    size = int(size_field, 16)
+                except ValueError:
+                    raise RequestError(400, 'Bad Request', 'Invalid chunk size')
+                self._consume(index + len(CRLF))
+                self.chunked_total += size
+                if self.chunked_total > self.max_body_bytes:
+                    raise RequestError(413, 'Content Too Large', 'Request body too large')
+                self.body_remaining = size
+                self.chunked_state = 'data' if size else 'trailer'
+
+            elif self.chunked_state == 'data':
+                self.body_remaining -= self._take_body(self.body_remaining)
+                if self.body_remaining:
+                    return False
+                self.chunked_state = 'data_end'
+
+            elif self.chunked_state == 'data_end':
+                if len(self.buffer) < len(CRLF):
+                    return False
+                if self.buffer[:len(CRLF)] != CRLF:
+                    raise RequestError(400, 'Bad Request', 'Missing CRLF after chunk data')
+                self._consume(len(CRLF))
+                self.chunked_state = 'size'
+
+            else:
+                # trailer header diabaikan, baris kosong menandai akhir request
+                index = self.buffer.find(CRLF)
+                if index == -1:
+                    if len(self.buffer) > self.max_header_bytes:
+                        raise RequestError(431, 'Request Header Fields Too Large', 'Trailer too large')
+                    return False
+                self._consume(index + len(CRLF))
+                if index == 0:
+                    return True
+
+    def idle(self):
+        """True jika tidak ada request yang sedang diterima sebagian"""
+        return self.head is None and not self.buffer
+
+    def close(self):
+        """Membuang body streaming yang belum selesai saat koneksi ditutup"""
+        if self.sink is not None:
+            self.sink.abort()
+            self.sink = None
+
+    def requests(self):
+        while True:
+            request = self.next_request()
+            if request is None:
+                return
+            yield request
@@ -0,0 +1,56 @@
+import os
+
+"""
+* sendmsg_all mengirim response yang tersusun dari beberapa buffer
+(header, body, penutup) dengan sendmsg (writev): semua buffer keluar
+dalam satu system call tanpa disalin dulu ke satu bytes baru
+
+* untuk response kecil, menyalin beberapa KB lebih murah daripada biaya
+tetap sendmsg di Python. diukur lewat socketpair, sendmsg baru lebih cepat
+mulai sekitar 32 KB, sehingga response sampai SMALL_RESPONSE digabung
+dan dikirim dengan sendall biasa
+
+* sendmsg boleh mengirim sebagian, sisanya dikirim ulang mulai dari byte
+yang belum terkirim, paling banyak IOV_MAX buffer per panggilan
+"""
+
+# response sampai ukuran ini digabung dan dikirim dengan satu send biasa
+SMALL_RESPONSE = 32768
+# jumlah buffer maksimum dalam satu sendmsg
+try:
+    IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 1024
+
+
+def sendmsg_all(sock, buffers):
+    """Seperti sendall untuk list buffer"""
+    if len(buffers) == 1:
+        sock.sendall(buffers[0])
+        return
+    total = sum(map(len, buffers))
+    if total <= SMALL_RESPONSE:
+        sock.sendall(b''.join(buffers))
+        return
+    if not hasattr(sock, 'sendmsg'):
+        for buffer in buffers:
+            sock.sendall(buffer)
+        return
+    if len(buffers) <= IOV_MAX:
+        # biasanya semua buffer terkirim pada sendmsg pertama
+        sent = sock.sendmsg(buffers)
+        if sent == total:
+            return
+    else:
+        sent = 0
+    views = [memoryview(buffer) for buffer in buffers]
+    index = 0
+    while True:
+        while index < len(views) and sent >= views[index].nbytes:
+            sent -= views[index].nbytes
+            index += 1
+        if index == len(views):
+            return
+        if sent:
+            views[index] = views[index][sent:]
+        sent = sock.sendmsg(views[index:index + IOV_MAX])
@@ -1,42 +1,96 @@
 import socket
+import select
+import time
+import multiprocessing
 from concurrent.futures import ProcessPoolExecutor
+import argparse
 from http import HttpServer
+from request_reader import RequestError, RequestReader
 
 httpserver = HttpServer()
 default_address = ('0.0.0.0', 8080)
 
+# detik tanpa request sebelum koneksi keep-alive ditutup
+IDLE_TIMEOUT = 5
+# jumlah request maksimum dalam satu koneksi
+MAX_REQUESTS = 100
+# jeda pengecekan pool saat koneksi keep-alive menunggu request berikutnya
+IDLE_POLL = 0.05
 
-def process_the_client(connection, address):
-    rcv = ""
+# koneksi yang sudah diterima dan belum selesai dilayani (multiprocessing.Value
+# milik proses utama, diberikan ke worker lewat init_worker). lebih banyak dari
+# jumlah worker berarti ada koneksi yang antre menunggu worker
+active_connections = None
+pool_size = 1
+
+
+def init_worker(counter, workers):
+    global active_connections, pool_size
+    active_connections = counter
+    pool_size = workers
+
+
+def pool_saturated():
+    return active_connections is not None and active_connections.value > pool_size
+
+
+def wait_next_request(connection, idle_timeout):
+    """Menunggu request berikutnya di koneksi keep-alive. False jika client diam
+    lebih dari idle_timeout, atau ada koneksi lain yang antre: worker tidak
+    ditahan oleh koneksi yang diam saat pool penuh"""
+    deadline = time.monotonic() + idle_timeout
     while True:
-        try:
-            data = connection.recv(32)
-            if data:
-                # merubah input dari socket (berupa bytes) ke dalam string
-                # agar bisa mendeteksi \r\n
-                d = data.decode()
-                rcv = rcv+d
-                if rcv.endswith('\r\n'):
-                    # end of command, proses string
-                    # logging.warning("data dari client: {}" . format(rcv))
-                    hasil = httpserver.proses(rcv)
-                    # hasil akan berupa bytes
-                    # untuk bisa ditambahi dengan string, maka string harus di encode
-                    hasil = hasil+"\r\n\r\n".encode()
-                    # logging.warning("balas ke  client: {}" . format(hasil))
-                    # hasil sudah dalam bentuk bytes
-                    connection.sendall(hasil)
-                    rcv = ""
-                    connection.close()
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        readable, _, _ = select.select([connection], [], [], min(remaining, IDLE_POLL))
+        if readable:
+            return True
+        if pool_saturated():
+            return False
+
+
+def process_the_client(connection, address, idle_timeout=IDLE_TIMEOUT, max_requests=MAX_REQUESTS):
+    # koneksi dipakai ulang untuk beberapa request (keep-alive), ditutup jika
+    # client diam lebih dari idle_timeout detik, sudah melayani max_requests,
+    # atau ada koneksi lain yang antre menunggu worker
+    connection.settimeout(idle_timeout)
+    # response untuk request pipelining dikirim berurutan, jangan ditahan Nagle
+    connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    # upload multipart ditulis ke disk sambil diterima, tidak ditampung di memori
+    reader = RequestReader(body_opener=httpserver.open_body)
+    served = 0
+    try:
+        while True:
+            # request yang dikirim berurutan tanpa menunggu response (pipelining)
+            # dijawab satu per satu sesuai urutan
+            for request in reader.requests():
+                served += 1
+                # logging.warning("data dari client: {}" . format(request))
+                # saat pool penuh koneksi ditutup setelah response ini (Connection: close)
+                # agar worker langsung melayani koneksi yang antre
+                hasil = httpserver.proses(request, keep_alive=served < max_requests and not pool_saturated())
+                # hasil berupa HttpResponse, body file dikirim dengan sendfile
+                # logging.warning("balas ke  client: {}" . format(hasil.head))
+                hasil.send(connection)
+                if not hasil.keep_alive:
                     return
-            else:
-                break
-        except OSError:
-            pass
-    connection.close()
+            if served and reader.idle() and not wait_next_request(connection, idle_timeout):
+                return
+            if not reader.recv_from(connection):
+                return
+    except RequestError as e:
+        # request rusak atau melewati batas, sisa data di koneksi tidak bisa dipercaya
+        httpserver.response(e.status, e.reason, str(e), {}).send(connection)
+    except OSError:
+        # termasuk socket.timeout saat koneksi idle
+        pass
+    finally:
+        reader.close()
+        connection.close()
 
 
-def run_server(max_workers=1):
+def run_server(max_workers=1, idle_timeout=IDLE_TIMEOUT, max_requests=MAX_REQUESTS):
     the_clients = []
     my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
@@ -44,11 +98,28 @@ def run_server(max_workers=1):
     my_socket.bind(default_address)
     my_socket.listen(1)
 
-    with ProcessPoolExecutor(max_workers) as executor:
+    counter = multiprocessing.Value('i', 0)
+
+    def connection_done(future, connection):
+        # salinan socket di proses utama ditutup setelah worker selesai,
+        # agar client melihat koneksi tertutup
+        connection.close()
+        with counter.get_lock():
+            counter.value -= 1
+
+    with ProcessPoolExecutor(max_workers, initializer=init_worker, initargs=(counter, max_workers)) as executor:
+        # worker dibuat (fork) sebelum accept pertama. jika dibuat saat submit
+        # pertama, semua worker ikut mewarisi socket koneksi pertama dan client
+        # itu tidak pernah melihat koneksi tertutup
+        for f in [executor.submit(int) for _ in range(max_workers)]:
+            f.result()
         while True:
             connection, client_address = my_socket.accept()
             # logging.warning("connection from {}".format(client_address))
-            p = executor.submit(process_the_client, connection, client_address)
+            with counter.get_lock():
+                counter.value += 1
+            p = executor.submit(process_the_client, connection, client_address, idle_timeout, max_requests)
+            p.add_done_callback(lambda f, connection=connection: connection_done(f, connection))
             the_clients.append(p)
             # menampilkan jumlah process yang sedang aktif
             for i, f in enumerate(the_clients):
@@ -57,7 +128,14 @@ def run_server(max_workers=1):
 
 
 def main():
-    run_server()
+    parser = argparse.ArgumentParser(description='HTTP file server')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--idle-timeout', type=float, default=IDLE_TIMEOUT,
+                        help='Seconds a keep-alive connection may stay idle')
+    parser.add_argument('--max-requests', type=int, default=MAX_REQUESTS,
+                        help='Requests served on one connection before it is closed')
+    args = parser.parse_args()
+    run_server(args.workers, args.idle_timeout, args.max_requests)
 
 
 if __name__ == "__main__":
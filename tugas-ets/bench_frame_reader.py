@@ -0,0 +1,97 @@
+import argparse
+import base64
+import os
+import time
+
+from frame_reader import FrameReader
+
+"""
+* micro-benchmark pembacaan satu request besar dari socket:
+  - legacy : loop lama di pool server (str += data.decode(), cek "\r\n\r\n" in d setiap recv)
+  - reader : FrameReader (bytearray + recv_into, pencarian dilanjutkan dari posisi terakhir)
+
+* socket diganti sumber data di memori yang mengembalikan potongan sebesar
+--chunk-size setiap recv, sehingga yang terukur hanya biaya framing
+"""
+
+
+class ChunkedSource:
+    """Meniru socket yang menerima data per potongan"""
+
+    def __init__(self, data, chunk_size):
+        self.view = memoryview(data)
+        self.offset = 0
+        self.chunk_size = chunk_size
+
+    def recv(self, bufsize):
+        n = min(bufsize, self.chunk_size)
+        chunk = self.view[self.offset:self.offset + n].tobytes()
+        self.offset += len(chunk)
+        return chunk
+
+    def recv_into(self, buffer):
+        n = min(len(buffer), self.chunk_size, len(self.view) - self.offset)
+        buffer[:n] = self.view[self.offset:self.offset + n]
+        self.offset += n
+        return n
+
+
+def make_request(size_mb):
+    block = base64.b64encode(os.urandom(786432))  # 1 MB teks base64
+    return b'UPLOAD bench.bin ' + block * size_mb + b'\r\n\r\n'
+
+
+def run_legacy(source):
+    commands = 0
+    d = ""
+    while True:
+        data = source.recv(52428800)
+        if not data:
+            break
+        d += data.decode()
+        while "\r\n\r\n" in d:
+            cmd, d = d.split("\r\n\r\n", 1)
+            commands += 1
+    return commands
+
+
+def run_reader(source):
+    commands = 0
+    reader = FrameReader()
+    while reader.recv_from(source):
+        for message in reader.messages():
+            commands += 1
+    return commands
+
+
+def measure(runner, request, chunk_size):
+    source = ChunkedSource(request, chunk_size)
+    start = time.perf_counter()
+    commands = runner(source)
+    duration = time.perf_counter() - start
+    assert commands == 1, f"expected 1 command, got {commands}"
+    return duration
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='FrameReader micro-benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100, 500],
+                        help='Request sizes in MB (default: 1 10 100 500)')
+    parser.add_argument('--chunk-size', type=int, default=65536,
+                        help='Bytes returned per recv (default: 65536)')
+    parser.add_argument('--legacy-max-mb', type=int, default=100,
+                        help='Skip the quadratic legacy loop above this size (default: 100)')
+    args = parser.parse_args()
+
+    print(f"{'size_mb':>8} {'legacy_s':>10} {'reader_s':>10} {'speedup':>8} {'reader_MB/s':>12}")
+    for size_mb in args.sizes:
+        request = make_request(size_mb)
+        reader_time = measure(run_reader, request, args.chunk_size)
+        if size_mb <= args.legacy_max_mb:
+            legacy_time = measure(run_legacy, request, args.chunk_size)
+            legacy_col = f"{legacy_time:10.3f}"
+            speedup_col = f"{legacy_time / reader_time:7.1f}x"
+        else:
+            legacy_col = f"{'skipped':>10}"
+            speedup_col = f"{'-':>8}"
+        print(f"{size_mb:8d} {legacy_col} {reader_time:10.3f} {speedup_col} {size_mb / reader_time:12.1f}")
@@ -0,0 +1,106 @@
+import argparse
+import json
+import os
+import socket
+import threading
+import time
+
+from file_protocol_v2 import (HEADER, MAGIC, STATUS_OK, TERMINATOR, encode_frame,
+                              encode_message, send_buffers)
+
+"""
+* micro-benchmark biaya penulisan satu response lewat socket sungguhan
+(socketpair), termasuk biaya system call send:
+  - legacy : cara lama (hasil JSON di-encode lalu digabung dengan "\r\n\r\n",
+             frame v2 kecil digabung dengan headernya, lalu sendall)
+  - buffers: list buffer dari encode_message/encode_frame, dikirim dengan
+             send_buffers (response besar: satu sendmsg, tanpa penggabungan)
+
+* response json meniru hasil GET protokol lama (JSON berisi base64),
+response v2 meniru frame GET berisi isi file mentah
+
+* sebuah thread menguras sisi penerima, yang diukur adalah waktu sampai
+--count response terkirim dan diterima seluruhnya
+"""
+
+
+def make_json(size_kb):
+    data = os.urandom(size_kb * 1024).hex()
+    return json.dumps(dict(status='OK', data_namafile='bench.bin', data_file=data))
+
+
+def run_legacy_json(connection, hasil, count):
+    for _ in range(count):
+        for buffer in [hasil.encode() + TERMINATOR]:
+            connection.sendall(buffer)
+
+
+def run_buffers_json(connection, hasil, count):
+    for _ in range(count):
+        send_buffers(connection, encode_message(hasil.encode()))
+
+
+def run_legacy_v2(connection, payload, count):
+    for _ in range(count):
+        name = b'bench.bin'
+        head = HEADER.pack(MAGIC, STATUS_OK, len(name), len(payload)) + name
+        frame = [head + payload] if len(payload) <= 65536 else [head, payload]
+        for buffer in frame:
+            connection.sendall(buffer)
+
+
+def run_buffers_v2(connection, payload, count):
+    for _ in range(count):
+        send_buffers(connection, encode_frame(STATUS_OK, 'bench.bin', payload))
+
+
+def drain(connection, received):
+    buffer = bytearray(1048576)
+    while n := connection.recv_into(buffer):
+        received[0] += n
+
+
+def measure_once(runner, response, count):
+    sender, receiver = socket.socketpair()
+    received = [0]
+    reader = threading.Thread(target=drain, args=(receiver, received))
+    reader.start()
+    start = time.perf_counter()
+    runner(sender, response, count)
+    sender.shutdown(socket.SHUT_WR)
+    reader.join()
+    duration = time.perf_counter() - start
+    sender.close()
+    receiver.close()
+    return duration / count * 1e6, received[0] // count
+
+
+def measure(runners, response, count, repeat):
+    # hasil terbaik dari beberapa kali pengukuran, mengurangi gangguan scheduler.
+    # runner diukur bergantian agar urutan tidak menguntungkan salah satunya
+    results = [[] for _ in runners]
+    for _ in range(repeat):
+        for runner, result in zip(runners, results):
+            result.append(measure_once(runner, response, count))
+    return [min(result) for result in results]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='File server response write micro-benchmark')
+    parser.add_argument('--count', type=int, default=20000, help='Responses per measurement')
+    parser.add_argument('--repeat', type=int, default=5, help='Measurements per case, best is reported')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[0, 1, 64, 1024],
+                        help='Response payload sizes in KB (default: 0 1 64 1024)')
+    args = parser.parse_args()
+
+    cases = [('json', make_json, run_legacy_json, run_buffers_json),
+             ('v2', lambda size_kb: os.urandom(size_kb * 1024), run_legacy_v2, run_buffers_v2)]
+    print(f"{'response':>12} {'bytes':>9} {'legacy_us':>10} {'buffers_us':>11} {'speedup':>8}")
+    for name, make, legacy, buffers in cases:
+        for size_kb in args.sizes:
+            response = make(size_kb)
+            # response besar diulang lebih sedikit agar waktu total tetap wajar
+            count = max(10, args.count // max(size_kb, 1))
+            (legacy_us, size), (buffers_us, _) = measure([legacy, buffers], response, count, args.repeat)
+            print(f"{name + ' ' + str(size_kb) + 'KB':>12} {size:9d} {legacy_us:10.1f} "
+                  f"{buffers_us:11.1f} {legacy_us / buffers_us:7.2f}x")
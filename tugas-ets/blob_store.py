@@ -0,0 +1,159 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+
+from filenames import check_filename
+
+"""
+* class BlobStore menyimpan isi file berdasarkan hash SHA-256-nya
+(content-addressed) di folder tersembunyi .blobs, dan setiap nama file
+yang dilayani server adalah hard link ke blob tersebut. isi yang sama
+hanya disimpan sekali walaupun diupload berkali-kali dengan nama berbeda
+
+* jumlah referensi sebuah blob adalah jumlah hard link inode-nya dikurangi
+satu (link milik .blobs sendiri), dihitung oleh filesystem sehingga tetap
+benar walaupun beberapa proses server memakai folder yang sama
+
+* saat sebuah nama dihapus atau ditimpa dan itu referensi terakhir, blob
+ikut dihapus. jika hal ini berbalapan dengan upload isi yang sama, paling
+buruk isi itu tidak lagi di-dedup, data file tidak pernah hilang
+
+* file yang ditaruh langsung di folder (tanpa lewat upload) tetap dilayani
+seperti biasa, hanya saja tidak ikut di-dedup
+"""
+
+BLOB_DIR = '.blobs'
+DIGEST_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+
+def is_digest(value):
+    return DIGEST_PATTERN.fullmatch(value) is not None
+
+
+def file_digest(fp, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    while chunk := fp.read(chunk_size):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BlobStore:
+    def __init__(self, directory='.'):
+        self.directory = directory
+        self.blob_dir = os.path.join(directory, BLOB_DIR)
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self.lock = threading.Lock()
+        # inode blob -> hash, untuk mencari blob milik sebuah nama saat dihapus
+        self.inodes = {}
+        self.stored = 0
+        self.deduplicated = 0
+        self.bytes_saved = 0
+        self.released = 0
+
+    def blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest)
+
+    def has(self, digest):
+        return is_digest(digest) and os.path.exists(self.blob_path(digest))
+
+    def store(self, name, tmp_path, digest):
+        """Menjadikan file sementara tmp_path (isi lengkap dengan hash digest)
+        sebagai file name. jika isi yang sama sudah ada, name di-link ke blob
+        yang ada dan tmp_path dibuang"""
+        path = os.path.join(self.directory, check_filename(name))
+        blob = self.blob_path(digest)
+        while True:
+            try:
+                os.link(tmp_path, blob)
+            except FileExistsError:
+                if self.link(name, digest):
+                    with self.lock:
+                        self.deduplicated += 1
+                        self.bytes_saved += os.path.getsize(tmp_path)
+                    os.remove(tmp_path)
+                    return
+                # blob baru saja dihapus oleh delete lain, coba simpan lagi
+                continue
+            with self.lock:
+                self.inodes[os.stat(blob).st_ino] = digest
+                self.stored += 1
+            old = self._stat(path)
+            os.replace(tmp_path, path)
+            self.release(old)
+            return
+
+    def link(self, name, digest):
+        """Membuat name menunjuk ke blob digest, False jika blob tidak ada"""
+        if not is_digest(digest):
+            return False
+        path = os.path.join(self.directory, check_filename(name))
+        # link sementara dibuat di folder blob, bukan di folder yang di-index
+        tmp_path = os.path.join(self.blob_dir, f'.link-{os.getpid()}-{threading.get_ident()}')
+        if os.path.lexists(tmp_path):
+            # sisa dari proses sebelumnya yang berhenti di tengah jalan
+            os.remove(tmp_path)
+        try:
+            os.link(self.blob_path(digest), tmp_path)
+        except FileNotFoundError:
+            return False
+        old = self._stat(path)
+        if old is not None and os.path.samestat(old, os.stat(tmp_path)):
+            # name sudah berisi blob ini
+            os.remove(tmp_path)
+            return True
+        os.replace(tmp_path, path)
+        self.release(old)
+        return True
+
+    def _stat(self, path):
+        try:
+            return os.stat(path)
+        except FileNotFoundError:
+            return None
+
+    def release(self, old):
+        """Dipanggil setelah sebuah nama dengan stat old dihapus atau ditimpa,
+        menghapus blob-nya jika tidak ada nama lain yang memakainya"""
+        # nlink 2 sebelum dilepas: hanya nama itu dan blob-nya sendiri
+        if old is None or old.st_nlink != 2:
+            return
+        # dicoba dua kali: inode di cache bisa saja milik blob lama yang sudah dihapus
+        for attempt in range(2):
+            digest = self._digest_of(old.st_ino)
+            if digest is None:
+                return
+            blob = self.blob_path(digest)
+            with self.lock:
+                try:
+                    st = os.stat(blob)
+                    if st.st_ino == old.st_ino:
+                        if st.st_nlink == 1:
+                            os.remove(blob)
+                            self.inodes.pop(old.st_ino, None)
+                            self.released += 1
+                        return
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    logging.warning(f"gagal melepas blob {digest}: {str(e)}")
+                    return
+                self.inodes.pop(old.st_ino, None)
+
+    def _digest_of(self, inode):
+        with self.lock:
+            digest = self.inodes.get(inode)
+            if digest is None:
+                # blob dibuat proses lain atau sebelum server dijalankan
+                with os.scandir(self.blob_dir) as it:
+                    for entry in it:
+                        if is_digest(entry.name):
+                            self.inodes[entry.inode()] = entry.name
+                digest = self.inodes.get(inode)
+            return digest
+
+    def stats(self):
+        with self.lock:
+            return dict(stored=self.stored, deduplicated=self.deduplicated,
+                        bytes_saved=self.bytes_saved, released=self.released)
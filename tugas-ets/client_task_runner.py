@@ -20,36 +20,74 @@ def generate_test_file(file_size_mb):
             f.write(os.urandom(file_size_mb * 1024 * 1024))
     return path
 
+def perform_request(http, operation, file_size_mb, headers):
+    """Performs one request; http is the requests module or a requests.Session.
+
+    Returns (success, bytes_processed, wire_bytes, decoded_bytes): wire_bytes is
+    the response body as received (compressed if the server used
+    Content-Encoding), decoded_bytes the body after decompression.
+    """
+    bytes_processed = 0
+    if operation == 'upload':
+        path = generate_test_file(file_size_mb)
+        with open(path, 'rb') as f:
+            response = http.post(f"http://{SERVER_HOST}:{SERVER_PORT}/upload", files={"file": f}, headers=headers)
+            success = response.ok
+            if success:
+                bytes_processed = os.path.getsize(path)
+
+    elif operation == 'download':
+        filename = f"test_{file_size_mb}MB.dat"
+        response = http.get(f"http://{SERVER_HOST}:{SERVER_PORT}/download/{filename}", headers=headers)
+        success = response.ok
+        if success:
+            bytes_processed = len(response.content)
+
+    elif operation == 'list':
+        response = http.get(f"http://{SERVER_HOST}:{SERVER_PORT}/list", headers=headers)
+        success = response.ok
+
+    # response.content is already read, raw.tell() counts the bytes taken off the wire
+    decoded_bytes = len(response.content)
+    wire_bytes = response.raw.tell() or decoded_bytes
+    return (success, bytes_processed, wire_bytes, decoded_bytes)
+
 def perform_operation(args):
-    """Worker function to simulate client operation."""
+    """Worker function to simulate client operation.
+
+    Sends args['requests'] requests. With args['keep_alive'] they share one
+    connection through a requests.Session, otherwise each request opens a
+    new connection. Without args['compression'] the client asks for
+    Accept-Encoding: identity.
+    """
     operation, file_size_mb = args['operation'], args['file_size']
     success = True
     bytes_processed = 0
+    completed = 0
+    wire_bytes = 0
+    decoded_bytes = 0
+    headers = {} if args.get('compression', True) else {'Accept-Encoding': 'identity'}
+    cpu_start = time.thread_time()
+    http = requests.Session() if args.get('keep_alive') else requests
     try:
-        if operation == 'upload':
-            path = generate_test_file(file_size_mb)
-            with open(path, 'rb') as f:
-                response = requests.post(f"http://{SERVER_HOST}:{SERVER_PORT}/upload", files={"file": f})
-                success = response.ok
-                if success:
-                    bytes_processed = os.path.getsize(path)
-
-        elif operation == 'download':
-            filename = f"test_{file_size_mb}MB.dat"
-            response = requests.get(f"http://{SERVER_HOST}:{SERVER_PORT}/download/{filename}")
-            success = response.ok
-            if success:
-                bytes_processed = len(response.content)
-
-        elif operation == 'list':
-            response = requests.get(f"http://{SERVER_HOST}:{SERVER_PORT}/list")
-            success = response.ok
+        for _ in range(args.get('requests', 1)):
+            ok, processed, wire, decoded = perform_request(http, operation, file_size_mb, headers)
+            success = success and ok
+            wire_bytes += wire
+            decoded_bytes += decoded
+            if ok:
+                bytes_processed += processed
+                completed += 1
 
     except Exception as e:
         print(f"[ERROR] Client failed: {e}")
         success = False
+    finally:
+        if http is not requests:
+            http.close()
 
-    return (success, bytes_processed)
+    cpu_seconds = time.thread_time() - cpu_start
+    return (success, bytes_processed, completed, wire_bytes, decoded_bytes, cpu_seconds)
 
 def run_with_threads(args_list, num_clients):
     results = []
@@ -73,17 +111,35 @@ def run_with_processes(args_list, num_clients):
         results = pool.map(perform_operation, args_list)
     return results
 
+def server_compression_stats():
+    """Compression counters from the HTTP server's /stats, None if unavailable."""
+    try:
+        response = requests.get(f"http://{SERVER_HOST}:{SERVER_PORT}/stats", timeout=5)
+        return response.json()['compression']
+    except Exception:
+        return None
+
 def main():
     parser = argparse.ArgumentParser(description='Client Task Runner')
     parser.add_argument('--operation', required=True, choices=['upload', 'download', 'list'])
     parser.add_argument('--file-size', type=int, choices=[10, 50, 100], required=True)
     parser.add_argument('--num-clients', type=int, required=True)
     parser.add_argument('--concurrency-model', choices=['thread', 'process'], required=True)
+    parser.add_argument('--requests-per-client', type=int, default=1)
+    parser.add_argument('--keep-alive', action='store_true',
+                        help='Reuse one connection per client instead of connecting for every request')
+    parser.add_argument('--no-compression', action='store_true',
+                        help='Send Accept-Encoding: identity so responses are not compressed')
     args = parser.parse_args()
 
-    args_list = [{'operation': args.operation, 'file_size': args.file_size} for _ in range(args.num_clients)]
+    args_list = [{'operation': args.operation, 'file_size': args.file_size,
+                  'requests': args.requests_per_client, 'keep_alive': args.keep_alive,
+                  'compression': not args.no_compression}
+                 for _ in range(args.num_clients)]
+    server_before = server_compression_stats()
 
     print(f"[INFO] Starting {args.num_clients} client(s) for '{args.operation}' with {args.file_size}MB file using {args.concurrency_model} model")
+    print(f"[INFO] {args.requests_per_client} request(s) per client, connection reuse: {'on' if args.keep_alive else 'off'}")
     start_time = time.time()
 
     if args.concurrency_model == 'thread':
@@ -98,6 +154,12 @@ def main():
     failed = args.num_clients - successful
     total_bytes = sum(r[1] for r in results if r[0])
     throughput = total_bytes / duration if duration > 0 else 0
+    total_requests = sum(r[2] for r in results)
+    request_rate = total_requests / duration if duration > 0 else 0
+    wire_bytes = sum(r[3] for r in results)
+    decoded_bytes = sum(r[4] for r in results)
+    client_cpu = sum(r[5] for r in results)
+    server_after = server_compression_stats()
 
     print("\n[RESULT SUMMARY]")
     print(f"Operation: {args.operation}")
@@ -106,6 +168,14 @@ def main():
     print(f"Concurrency: {args.concurrency_model}")
     print(f"Total Time: {duration:.2f}s")
     print(f"Throughput: {throughput:.2f} B/s")
+    print(f"Keep-Alive: {'on' if args.keep_alive else 'off'}")
+    print(f"Requests: {total_requests} ({request_rate:.2f} req/s)")
+    print(f"Compression: {'off' if args.no_compression else 'on'}")
+    print(f"Wire Bytes: {wire_bytes} (decoded {decoded_bytes}, saved {decoded_bytes - wire_bytes})")
+    print(f"Client CPU: {client_cpu:.3f}s")
+    if server_before is not None and server_after is not None:
+        server_cpu = server_after['cpu_seconds'] - server_before['cpu_seconds']
+        print(f"Server Compression CPU: {server_cpu:.3f}s")
     print(f"Success: {successful}, Fail: {failed}")
 
 if __name__ == '__main__':
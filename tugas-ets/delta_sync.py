@@ -0,0 +1,109 @@
+import base64
+import hashlib
+import math
+import zlib
+
+"""
+* SYNC mengirim hanya bagian file yang berubah, dengan algoritma seperti
+rsync: server membagi file lamanya menjadi blok berukuran tetap dan
+mengirim checksum setiap blok (signature), client mencari blok-blok itu
+di file barunya lalu mengirim daftar operasi berisi nomor blok yang bisa
+dipakai ulang dan data literal untuk sisanya (delta)
+
+* setiap blok punya dua checksum: weak (adler32) yang dapat digeser satu
+byte dengan murah (rolling) untuk mencari blok di posisi mana saja, dan
+strong (blake2b 128 bit) yang hanya dihitung jika weak cocok
+
+* modul ini dipakai oleh server (signature, apply) dan client (delta)
+"""
+
+MOD_ADLER = 65521
+MIN_BLOCK_SIZE = 1024
+MAX_BLOCK_SIZE = 65536
+
+
+def default_block_size(size):
+    """Ukuran blok sekitar akar ukuran file (seperti rsync), kelipatan 1 KB"""
+    block_size = math.isqrt(max(size, 1))
+    block_size = (block_size + MIN_BLOCK_SIZE - 1) // MIN_BLOCK_SIZE * MIN_BLOCK_SIZE
+    return max(MIN_BLOCK_SIZE, min(MAX_BLOCK_SIZE, block_size))
+
+
+def weak_checksum(data):
+    return zlib.adler32(data)
+
+
+def strong_checksum(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def signature(fp, block_size):
+    """List [weak, strong] untuk setiap blok file, blok terakhir boleh lebih pendek"""
+    blocks = []
+    while block := fp.read(block_size):
+        blocks.append([weak_checksum(block), strong_checksum(block)])
+    return blocks
+
+
+def literal(data):
+    return base64.b64encode(data).decode()
+
+
+def compute_delta(data, block_size, blocks, base_size):
+    """Operasi untuk membentuk data dari file lama (berukuran base_size) yang
+    signature-nya blocks: int berarti salin blok nomor itu, string berarti
+    data literal (base64)"""
+    # blok terakhir yang lebih pendek hanya dicocokkan dengan ekor data
+    last_length = base_size - (len(blocks) - 1) * block_size if blocks else 0
+    full_blocks = len(blocks) if last_length == block_size else len(blocks) - 1
+    table = {}
+    for index in range(full_blocks):
+        weak, strong = blocks[index]
+        table.setdefault(weak, []).append((index, strong))
+
+    def find(weak, start):
+        strong = strong_checksum(data[start:start + block_size])
+        for index, candidate in table[weak]:
+            if candidate == strong:
+                return index
+        return None
+
+    ops = []
+    size = len(data)
+    literal_start = 0
+    pos = 0
+    weak = None
+    while pos + block_size <= size:
+        if weak is None:
+            weak = weak_checksum(data[pos:pos + block_size])
+            a = weak & 0xffff
+            b = weak >> 16
+        match = find(weak, pos) if weak in table else None
+        if match is not None:
+            if literal_start < pos:
+                ops.append(literal(data[literal_start:pos]))
+            ops.append(match)
+            pos += block_size
+            literal_start = pos
+            weak = None
+            continue
+        if pos + block_size == size:
+            break
+        # geser jendela satu byte: buang data[pos], tambah data[pos + block_size]
+        out_byte = data[pos]
+        a = (a - out_byte + data[pos + block_size]) % MOD_ADLER
+        b = (b - block_size * out_byte + a - 1) % MOD_ADLER
+        weak = (b << 16) | a
+        pos += 1
+
+    tail_start = size - last_length
+    if full_blocks < len(blocks) and literal_start <= tail_start < size:
+        tail = data[tail_start:]
+        if [weak_checksum(tail), strong_checksum(tail)] == blocks[-1]:
+            if literal_start < tail_start:
+                ops.append(literal(data[literal_start:tail_start]))
+            ops.append(len(blocks) - 1)
+            literal_start = size
+    if literal_start < size:
+        ops.append(literal(data[literal_start:]))
+    return ops
@@ -1,9 +1,22 @@
 import socket
 import json
 import base64
+import hashlib
 import logging
+import mmap
+import os
+import shlex
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from delta_sync import compute_delta
+from file_protocol_v2 import (OP_DELETE, OP_GET, OP_LIST, OP_UPLOAD, STATUS_OK,
+                              TERMINATOR, pack_header, recv_exactly,
+                              recv_frame, recv_frame_header,
+                              recv_payload_to_file, send_frame)
 
 server_address=('0.0.0.0',7777)
+protocol_version=1
 
 def send_command(command_str=""):
     global server_address
@@ -12,23 +25,25 @@ def send_command(command_str=""):
     logging.warning(f"connecting to {server_address}")
     try:
         logging.warning(f"sending message ")
-        sock.sendall(command_str.encode())
+        sock.sendall(command_str.encode() + TERMINATOR)
         # Look for the response, waiting until socket is done (no more data)
-        data_received="" #empty string
+        data_received = bytearray()
         while True:
             #socket does not receive all data at once, data comes in part, need to be concatenated at the end of process
-            data = sock.recv(16)
+            data = sock.recv(65536)
             if data:
                 #data is not empty, concat with previous content
-                data_received += data.decode()
-                if "\r\n\r\n" in data_received:
+                scan = max(0, len(data_received) - len(TERMINATOR) + 1)
+                data_received += data
+                if data_received.find(TERMINATOR, scan) != -1:
                     break
             else:
                 # no more data, stop the process by break
                 break
-        # at this point, data_received (string) will contain all data coming from the socket
+        # at this point, data_received (bytes) will contain all data coming from the socket
         # to be able to use the data_received as a dict, need to load it using json.loads()
-        hasil = json.loads(data_received)
+        end = data_received.find(TERMINATOR)
+        hasil = json.loads(data_received[:end] if end != -1 else data_received)
         logging.warning("data received from server:")
         return hasil
     except:
@@ -36,17 +51,54 @@ def send_command(command_str=""):
         return False
 
 
-def remote_list():
-    command_str=f"LIST"
-    hasil = send_command(command_str)
-    if (hasil['status']=='OK'):
-        print("daftar file : ")
+def remote_list(pattern="*", page_size=1000):
+    # daftar diminta per halaman dengan cursor, client hanya memegang satu halaman
+    cursor = ""
+    print("daftar file : ")
+    while True:
+        command_str=f"LIST {shlex.quote(pattern)} {page_size} {shlex.quote(cursor)}"
+        hasil = send_command(command_str)
+        if not hasil or hasil['status']!='OK':
+            print("Gagal")
+            return False
         for nmfile in hasil['data']:
             print(f"- {nmfile}")
-        return True
-    else:
-        print("Gagal")
-        return False
+        if not hasil.get('next_cursor'):
+            return True
+        cursor = hasil['next_cursor']
+
+def iter_messages(sock):
+    """Membaca pesan JSON berturut-turut (dipisah TERMINATOR) dari satu koneksi"""
+    buffer = b''
+    while True:
+        index = buffer.find(TERMINATOR)
+        if index != -1:
+            yield json.loads(buffer[:index])
+            buffer = buffer[index + len(TERMINATOR):]
+            continue
+        data = sock.recv(65536)
+        if not data:
+            return
+        buffer += data
+
+def remote_list_stream(pattern="*", fields=""):
+    # LIST --stream: server mengirim beberapa pesan dalam satu koneksi sampai more=False
+    command_str=f"LIST {shlex.quote(pattern)} --stream"
+    if fields:
+        command_str += f" --fields={fields}"
+    with connect() as sock:
+        sock.sendall(command_str.encode() + TERMINATOR)
+        print("daftar file : ")
+        for hasil in iter_messages(sock):
+            if hasil['status']!='OK':
+                print(f"Gagal: {hasil['data']}")
+                return False
+            for nmfile in hasil['data']:
+                print(f"- {nmfile}")
+            if not hasil['more']:
+                return True
+    print("Gagal: koneksi terputus")
+    return False
 
 def remote_get(filename=""):
     command_str=f"GET {filename}"
@@ -63,10 +115,99 @@ def remote_get(filename=""):
         print("Gagal")
         return False
 
-def remote_upload(filename=""):
+def remote_get_parallel(filename="", segment_size=4 * 1024 * 1024, connections=4, retries=3):
+    # file diunduh per segmen lewat beberapa koneksi dan ditulis langsung ke posisinya.
+    # segmen yang sudah selesai dicatat di <nama>.part.json, unduhan yang terputus
+    # dilanjutkan dari sana selama file di server belum berubah
+    info = send_command(f"STAT {shlex.quote(filename)}")
+    if not info or info['status'] != 'OK':
+        print(f"Gagal: {info['data'] if info else 'tidak ada response'}")
+        return False
+    target = os.path.basename(filename)
+    part_path = target + '.part'
+    state_path = part_path + '.json'
+    size = info['size']
+
+    state = None
+    if os.path.exists(state_path) and os.path.exists(part_path):
+        with open(state_path) as fp:
+            state = json.load(fp)
+        if (state['version'], state['size'], state['segment_size']) != (info['version'], size, segment_size):
+            state = None
+    if state is None:
+        state = dict(version=info['version'], size=size, segment_size=segment_size, done=[])
+        with open(part_path, 'wb') as fp:
+            fp.truncate(size)
+    done = set(state['done'])
+    pending = [offset for offset in range(0, size, segment_size) if offset not in done]
+    if done:
+        print(f"melanjutkan unduhan: {len(done)} segmen sudah ada, {len(pending)} segmen tersisa")
+
+    lock = threading.Lock()
+    fd = os.open(part_path, os.O_WRONLY)
+
+    def save_state():
+        with open(state_path + '.tmp', 'w') as fp:
+            json.dump(state, fp)
+        os.replace(state_path + '.tmp', state_path)
+
+    def fetch(offset):
+        for attempt in range(1, retries + 1):
+            hasil = send_command(f"GET {shlex.quote(filename)} {offset} {segment_size}")
+            if hasil and hasil['status'] == 'OK':
+                if hasil['version'] != state['version']:
+                    raise ValueError('file di server berubah selama diunduh')
+                data = base64.b64decode(hasil['data_file'])
+                written = 0
+                while written < len(data):
+                    written += os.pwrite(fd, data[written:], offset + written)
+                with lock:
+                    state['done'].append(offset)
+                    save_state()
+                return True
+            logging.warning(f"segmen {offset} gagal (percobaan {attempt}): {hasil['data'] if hasil else 'tidak ada response'}")
+        return False
+
+    try:
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            results = list(executor.map(fetch, pending))
+    except ValueError as e:
+        os.close(fd)
+        # state baru ditulis setelah segmen pertama selesai, bisa saja belum ada
+        for path in (part_path, state_path):
+            if os.path.exists(path):
+                os.remove(path)
+        print(f"Gagal: {str(e)}")
+        return False
+    os.close(fd)
+    if not all(results):
+        print(f"Gagal: {results.count(False)} segmen belum terunduh, jalankan lagi untuk melanjutkan")
+        return False
+    os.replace(part_path, target)
+    if os.path.exists(state_path):
+        os.remove(state_path)
+    print(f"File berhasil diunduh ({size} bytes)")
+    return True
+
+def local_digest(filename):
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as fp:
+        while chunk := fp.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def remote_upload(filename="", skip_existing=True, remote_name=None):
+    # remote_name: nama file di server, default sama dengan filename
+    remote_name = remote_name or filename
+    if skip_existing:
+        # isi yang sudah ada di server tidak perlu dikirim ulang
+        res = send_command(f"UPLOAD_IF_ABSENT {shlex.quote(remote_name)} {local_digest(filename)}")
+        if res and res['status']=='OK' and res['exists']:
+            print("File berhasil terkirim (isi sudah ada di server)")
+            return True
     file = open(filename,'rb')
     content = base64.b64encode(file.read()).decode()
-    command_str=f"UPLOAD {filename} {content}"
+    command_str=f"UPLOAD {remote_name} {content}"
     res = send_command(command_str)
     if (res['status']=='OK'):
         print("File berhasil terkirim")
@@ -75,6 +216,67 @@ def remote_upload(filename=""):
         print("Gagal")
         return False
     
+def remote_upload_parallel(filename="", part_size=4 * 1024 * 1024, connections=4, retries=3, remote_name=None):
+    # file dikirim per bagian lewat beberapa koneksi sekaligus, bagian yang gagal diulang sendiri
+    remote_name = remote_name or os.path.basename(filename)
+    size = os.path.getsize(filename)
+    res = send_command(f"UPLOAD_INIT {shlex.quote(remote_name)} {size}")
+    if not res or res['status'] != 'OK':
+        print(f"Gagal: {res['data'] if res else 'tidak ada response'}")
+        return False
+    upload_id = res['upload_id']
+
+    def send_part(offset):
+        with open(filename, 'rb') as fp:
+            data = os.pread(fp.fileno(), part_size, offset)
+        content = base64.b64encode(data).decode()
+        for attempt in range(1, retries + 1):
+            res = send_command(f"UPLOAD_PART {upload_id} {offset} {content}")
+            if res and res['status'] == 'OK':
+                return True
+            logging.warning(f"part {offset} gagal (percobaan {attempt}): {res['data'] if res else 'tidak ada response'}")
+        return False
+
+    with ThreadPoolExecutor(max_workers=connections) as executor:
+        results = list(executor.map(send_part, range(0, size, part_size)))
+    if not all(results):
+        send_command(f"UPLOAD_ABORT {upload_id}")
+        print(f"Gagal: {results.count(False)} part tidak terkirim")
+        return False
+
+    res = send_command(f"UPLOAD_COMMIT {upload_id} {local_digest(filename)}")
+    if res and res['status'] == 'OK':
+        print(f"File berhasil terkirim ({len(results)} part)")
+        return True
+    print(f"Gagal: {res['data'] if res else 'tidak ada response'}")
+    return False
+
+def remote_sync(filename=""):
+    # hanya bagian yang berubah dibanding file di server yang dikirim (lihat delta_sync.py)
+    name = os.path.basename(filename)
+    sig = send_command(f"SYNC_SIGNATURE {shlex.quote(name)}")
+    if not sig or sig['status'] != 'OK':
+        # file belum ada di server, kirim utuh
+        return remote_upload(filename, remote_name=name)
+    with open(filename, 'rb') as fp:
+        size = os.fstat(fp.fileno()).st_size
+        data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        try:
+            ops = compute_delta(data, sig['block_size'], sig['blocks'], sig['size'])
+            digest = hashlib.sha256(data).hexdigest()
+        finally:
+            if size:
+                data.close()
+    delta = dict(base=sig['base'], block_size=sig['block_size'], size=size, sha256=digest, ops=ops)
+    res = send_command(f"SYNC_APPLY {name} {json.dumps(delta, separators=(',', ':'))}")
+    if res and res['status']=='OK':
+        print(f"File berhasil disinkronkan: {res['literal_bytes']} bytes dikirim, "
+              f"{res['reused_bytes']} bytes dipakai ulang dari file di server")
+        return True
+    else:
+        print(f"Gagal: {res['data'] if res else 'tidak ada response'}")
+        return False
+
 def remote_delete(filename=""):
     command_str=f"DELETE {filename}"
     res = send_command(command_str)
@@ -84,7 +286,119 @@ def remote_delete(filename=""):
     else:
         print("Gagal")
         return False
-    
+
+
+class Batch:
+    """Menyusun beberapa perintah untuk dikirim dalam satu request BATCH.
+
+    contoh:
+        batch = Batch()
+        batch.get("a.txt").delete("b.txt").list("*.jpg")
+        hasil = batch.send()    # list hasil, urutannya sama dengan perintah
+    """
+
+    def __init__(self):
+        self.commands = []
+
+    def get(self, filename):
+        self.commands.append(f"GET {shlex.quote(filename)}")
+        return self
+
+    def delete(self, filename):
+        self.commands.append(f"DELETE {shlex.quote(filename)}")
+        return self
+
+    def list(self, pattern="*", limit=0):
+        self.commands.append(f"LIST {shlex.quote(pattern)} {limit}")
+        return self
+
+    def upload(self, filename, data=None):
+        # data: isi file (bytes), jika tidak ada dibaca dari file lokal
+        if data is None:
+            with open(filename, 'rb') as fp:
+                data = fp.read()
+        self.commands.append(f"UPLOAD {os.path.basename(filename)} {base64.b64encode(data).decode()}")
+        return self
+
+    def send(self):
+        hasil = send_command("BATCH " + json.dumps(self.commands))
+        if not hasil or hasil['status'] != 'OK':
+            logging.warning(f"batch gagal: {hasil['data'] if hasil else 'tidak ada response'}")
+            return False
+        return hasil['data']
+
+
+def remote_batch_delete(filenames):
+    # menghapus banyak file dengan satu koneksi
+    batch = Batch()
+    for filename in filenames:
+        batch.delete(filename)
+    hasil = batch.send()
+    if hasil is False:
+        print("Gagal")
+        return False
+    for filename, item in zip(filenames, hasil):
+        print(f"- {filename}: {item['status']}" + (f" ({item['data']})" if item['status'] != 'OK' else ""))
+    return all(item['status'] == 'OK' for item in hasil)
+
+
+# protokol v2: frame biner, isi file dikirim apa adanya tanpa base64
+
+def connect():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.connect(server_address)
+    logging.warning(f"connecting to {server_address}")
+    return sock
+
+def remote_list_v2():
+    with connect() as sock:
+        send_frame(sock, OP_LIST)
+        status, _, payload = recv_frame(sock)
+    if status == STATUS_OK:
+        print("daftar file : ")
+        for nmfile in json.loads(payload):
+            print(f"- {nmfile}")
+        return True
+    else:
+        print(f"Gagal: {payload.decode()}")
+        return False
+
+def remote_get_v2(filename=""):
+    with connect() as sock:
+        send_frame(sock, OP_GET, filename)
+        status, namafile, payload_length = recv_frame_header(sock)
+        if status != STATUS_OK:
+            print(f"Gagal: {recv_exactly(sock, payload_length).decode()}")
+            return False
+        with open(namafile, 'wb+') as fp:
+            recv_payload_to_file(sock, payload_length, fp)
+    return True
+
+def remote_upload_v2(filename=""):
+    name = os.path.basename(filename).encode()
+    with connect() as sock, open(filename, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        sock.sendall(pack_header(OP_UPLOAD, name, size) + name)
+        sock.sendfile(file)
+        status, _, payload = recv_frame(sock)
+    if status == STATUS_OK:
+        print("File berhasil terkirim")
+        return True
+    else:
+        print(f"Gagal: {payload.decode()}")
+        return False
+
+def remote_delete_v2(filename=""):
+    with connect() as sock:
+        send_frame(sock, OP_DELETE, filename)
+        status, _, payload = recv_frame(sock)
+    if status == STATUS_OK:
+        print("File berhasil terhapus")
+        return True
+    else:
+        print(f"Gagal: {payload.decode()}")
+        return False
+
 def show_menu():
     print("\n=== MENU ===")
     print("1. List file")
@@ -92,28 +406,48 @@ def show_menu():
     print("3. Upload file")
     print("4. Delete file")
     print("5. Keluar")
+    print(f"6. Ganti protokol (sekarang: v{protocol_version})")
+    print("7. Sinkronisasi file (kirim perubahan saja)")
+    print("8. Upload file paralel (per bagian)")
+    print("9. Download file paralel (per segmen, dapat dilanjutkan)")
 
 if __name__=='__main__':
     server_address=('127.0.0.1',8000)
     
     while True:
         show_menu()
-        choice = input("Pilih opsi [1-5]: ").strip()
+        choice = input("Pilih opsi [1-9]: ").strip()
         match choice:
             case '1':
-                remote_list()
+                if protocol_version == 2:
+                    remote_list_v2()
+                else:
+                    pattern = input("Pola nama file (kosong = semua): ").strip() or "*"
+                    remote_list(pattern)
             case '2':
                 filename = input("Masukkan nama file yang ingin diunduh: ")
-                remote_get(filename)
+                remote_get_v2(filename) if protocol_version == 2 else remote_get(filename)
             case '3':
                 filename = input("Masukkan nama file yang ingin diupload: ")
-                remote_upload(filename)
+                remote_upload_v2(filename) if protocol_version == 2 else remote_upload(filename)
             case '4':
                 filename = input("Masukkan nama file yang ingin dihapus: ")
-                remote_delete(filename)
+                remote_delete_v2(filename) if protocol_version == 2 else remote_delete(filename)
             case '5':
                 print("Keluar dari program.")
                 break
+            case '6':
+                protocol_version = 1 if protocol_version == 2 else 2
+                print(f"Menggunakan protokol v{protocol_version}")
+            case '7':
+                filename = input("Masukkan nama file yang ingin disinkronkan: ")
+                remote_sync(filename)
+            case '8':
+                filename = input("Masukkan nama file yang ingin diupload: ")
+                remote_upload_parallel(filename)
+            case '9':
+                filename = input("Masukkan nama file yang ingin diunduh: ")
+                remote_get_parallel(filename)
             case _:
                 print("Pilihan tidak valid!")
 
@@ -1,20 +1,156 @@
 import os
 import json
 import base64
-from glob import glob
+import binascii
+import hashlib
+import mmap
+import tempfile
+
+from blob_store import BlobStore, is_digest
+from delta_sync import MAX_BLOCK_SIZE, MIN_BLOCK_SIZE, default_block_size, signature
+from filenames import check_filename, valid_filename
+from metadata_index import MetadataIndex
+from upload_sessions import UploadSessions
+from response_cache import ResponseCache, file_version
+from single_flight import SingleFlight
+
+# batas memori cache GET, dapat diatur lewat environment variable
+CACHE_MAX_BYTES = int(os.environ.get('FILE_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+# index metadata: file SQLite (opsional, relatif terhadap folder files) dan jeda reconcile dalam detik
+INDEX_DB = os.environ.get('FILE_INDEX_DB')
+INDEX_INTERVAL = float(os.environ.get('FILE_INDEX_INTERVAL', 30))
+# file yang lebih besar dari ini dibaca lewat mmap, bukan read()
+MMAP_THRESHOLD = int(os.environ.get('FILE_MMAP_THRESHOLD', 1024 * 1024))
+# GET file besar dikirim per potongan sebesar ini (kelipatan 3: base64 tanpa padding di tengah)
+STREAM_CHUNK = 3 * 256 * 1024
+# jumlah entry per pesan pada LIST --stream
+LIST_PAGE_SIZE = 1000
+LIST_FIELDS = ('size', 'mtime', 'type')
+
+
+def map_file(fp, size):
+    """Isi file sebagai mmap read-only jika ukurannya minimal MMAP_THRESHOLD,
+    None jika lebih kecil. halaman file dibaca langsung dari page cache dan
+    dipakai bersama oleh semua pembaca, tanpa salinan bytes per request.
+    aman karena file tidak pernah ditulis di tempat: upload selalu menulis
+    file sementara lalu menggantinya"""
+    if size == 0 or size < MMAP_THRESHOLD:
+        return None
+    return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def current_umask():
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# mode file hasil upload, sama seperti file yang dibuat dengan open() biasa
+FILE_MODE = 0o666 & ~current_umask()
+
+
+def upload_temp_file(directory):
+    """File sementara untuk isi upload sebelum dipindahkan ke nama tujuannya.
+    dibuat di folder blob (filesystem yang sama, di luar folder yang di-index)
+    agar upload yang sedang berjalan tidak mengubah mtime folder files.
+    NamedTemporaryFile selalu membuat file 0600, mode diubah ke FILE_MODE
+    agar file hasil upload tetap dapat dibaca seperti file lainnya"""
+    fp = tempfile.NamedTemporaryFile(dir=directory, prefix='.upload-', delete=False)
+    os.fchmod(fp.fileno(), FILE_MODE)
+    return fp
+
+
+def encode_cursor(name):
+    """Cursor LIST berisi nama terakhir yang sudah dikirim, sehingga halaman
+    berikutnya tetap benar walaupun ada file yang ditambah/dihapus di antaranya"""
+    return base64.urlsafe_b64encode(name.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        return base64.urlsafe_b64decode(cursor.encode()).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError(f'cursor tidak valid: {cursor}')
+
+
+class UploadWriter:
+    """Menulis isi upload sedikit demi sedikit ke file sementara (sambil
+    menghitung hash SHA-256-nya), lalu menyimpannya ke store dengan nama
+    tujuan saat commit()"""
+
+    whitespace = b' \t\r\n'
+
+    def __init__(self, filename, store):
+        self.filename = filename
+        self.store = store
+        self.fp = upload_temp_file(store.blob_dir)
+        self.digest = hashlib.sha256()
+        self.pending = b''
+        self.size = 0
+        self.error = None
+
+    def write(self, data):
+        if self.error is None:
+            self.fp.write(data)
+            self.digest.update(data)
+            self.size += len(data)
+
+    def write_base64(self, data):
+        """Decode base64 per kelipatan 4 karakter, sisanya disimpan untuk potongan berikutnya"""
+        if self.error is not None:
+            return
+        data = self.pending + data.translate(None, self.whitespace)
+        usable = len(data) - len(data) % 4
+        self.pending = data[usable:]
+        try:
+            self.write(binascii.a2b_base64(data[:usable]))
+        except binascii.Error as e:
+            self.error = str(e)
+
+    def commit(self):
+        try:
+            if self.pending and self.error is None:
+                self.write(binascii.a2b_base64(self.pending))
+            if self.error is not None:
+                raise ValueError(self.error)
+            self.fp.close()
+            self.store.store(self.filename, self.fp.name, self.digest.hexdigest())
+        except Exception:
+            self.abort()
+            raise
+
+    def abort(self):
+        self.fp.close()
+        if os.path.exists(self.fp.name):
+            os.remove(self.fp.name)
 
 
 class FileInterface:
-    def __init__(self):
+    def __init__(self, cache_max_bytes=CACHE_MAX_BYTES):
         base_path = os.path.dirname(os.path.abspath(__file__))
         files_dir = os.path.join(base_path, 'files')
         os.chdir(files_dir)
-
+        self.cache = ResponseCache(cache_max_bytes)
+        # GET bersamaan untuk file (dan versi) yang sama cukup dibaca sekali
+        self.inflight = SingleFlight()
+        # LIST dilayani dari index, bukan membaca direktori setiap kali
+        self.index = MetadataIndex('.', db_path=INDEX_DB, reconcile_interval=INDEX_INTERVAL)
+        self.index.start()
+        # isi file disimpan per hash, nama file adalah hard link ke isinya
+        self.store = BlobStore('.')
+        # upload per bagian (UPLOAD_INIT / UPLOAD_PART / UPLOAD_COMMIT)
+        self.sessions = UploadSessions('.')
 
     def list(self,params=[]):
         try:
-            filelist = glob('*.*')
-            return dict(status='OK',data=filelist)
+            pattern, limit, start_after, fields, stream = self._list_options(params)
+            # satu entry tambahan untuk mengetahui apakah masih ada halaman berikutnya
+            entries = self.index.listing(pattern, start_after, None if limit is None else limit + 1)
+            next_cursor = None
+            if limit is not None and len(entries) > limit:
+                entries = entries[:limit]
+                next_cursor = encode_cursor(entries[-1].name)
+            return dict(status='OK',data=self._list_data(entries, fields),next_cursor=next_cursor)
         except Exception as e:
             return dict(status='ERROR',data=str(e))
 
@@ -23,19 +159,36 @@ class FileInterface:
             filename = params[0]
             if (filename == ''):
                 return None
-            fp = open(f"{filename}",'rb')
-            isifile = base64.b64encode(fp.read()).decode()
+            check_filename(filename)
+            if len(params) > 1:
+                # GET <nama file> <offset> [length]: hanya sebagian file
+                length = int(params[2]) if len(params) > 2 else None
+                return self._get_range(filename, int(params[1]), length)
+            isifile = self._read_base64(filename)
             return dict(status='OK',data_namafile=filename,data_file=isifile)
         except Exception as e:
             return dict(status='ERROR',data=str(e))
 
+    def stat(self,params=[]):
+        """STAT <nama file>: ukuran dan versi file, versi berubah setiap kali isi file berubah"""
+        try:
+            filename = params[0]
+            if (filename == ''):
+                return None
+            check_filename(filename)
+            st = os.stat(filename)
+            return dict(status='OK',data_namafile=filename,size=st.st_size,
+                        mtime=st.st_mtime,version=list(file_version(st)))
+        except Exception as e:
+            return dict(status='ERROR',data=str(e))
+
     def upload(self,params=[]):
         try:
             filename = params[0]
             if(filename == ''):
                 return None
-            fp = open(f"{filename}", "wb")
-            fp.write(base64.b64decode(params[1]))
+            check_filename(filename)
+            self._write_file(filename, base64.b64decode(params[1]))
             return dict(status='OK')
         except Exception as e:
             return dict(status='ERROR',data=str(e))
@@ -45,11 +198,350 @@ class FileInterface:
             filename=params[0]
             if(filename==''):
                 return None
+            check_filename(filename)
+            old = os.stat(filename)
             os.remove(filename)
+            self.store.release(old)
+            self.cache.invalidate(filename)
+            self.index.remove(filename)
             return dict(status="OK")
         except Exception as e:
             return dict(status="ERROR",data=str(e))
 
+    def upload_init(self,params=[]):
+        """UPLOAD_INIT <nama file> <ukuran>: membuka upload per bagian"""
+        try:
+            filename = params[0]
+            if(filename == ''):
+                return None
+            check_filename(filename)
+            upload_id = self.sessions.init(filename, int(params[1]))
+            return dict(status='OK',upload_id=upload_id)
+        except Exception as e:
+            return dict(status='ERROR',data=str(e))
+
+    def upload_part(self,params=[]):
+        """UPLOAD_PART <upload id> <offset> <isi base64>: boleh dikirim dengan urutan
+        bebas lewat koneksi mana saja, dan boleh diulang jika gagal"""
+        try:
+            data = base64.b64decode(params[2])
+            self.sessions.write_part(params[0], int(params[1]), data)
+            return dict(status='OK',offset=int(params[1]),size=len(data))
+        except Exception as e:
+            return dict(status='ERROR',data=str(e))
+
+    def upload_commit(self,params=[]):
+        """UPLOAD_COMMIT <upload id> [sha256]: menyimpan file jika semua part sudah
+        diterima (dan hash-nya sesuai jika diberikan)"""
+        try:
+            filename, data_path, digest = self.sessions.finish(params[0])
+            if len(params) > 1 and params[1].lower() != digest:
+                os.remove(data_path)
+                return dict(status='ERROR',data='hash file tidak sesuai, upload dibatalkan')
+            self.store.store(filename, data_path, digest)
+            self.cache.invalidate(filename)
+            self.index.update(filename)
+            return dict(status='OK',data_namafile=filename,sha256=digest)
+        except Exception as e:
+            return dict(status='ERROR',data=str(e))
+
+    def upload_abort(self,params=[]):
+        try:
+            self.sessions.abort(params[0])
+            return dict(status='OK')
+        except Exception as e:
+            return dict(status='ERROR',data=str(e))
+
+    def has(self,params=[]):
+        try:
+            if not params:
+                return dict(status='ERROR',data='hash tidak diberikan')
+            return dict(status='OK',data={digest: self.store.has(digest) for digest in params})
+        except Exception as e:
+            return dict(status='ERROR',data=str(e))
+
+    def upload_if_absent(self,params=[]):
+        """UPLOAD_IF_ABSENT <nama file> <sha256>: jika isi dengan hash itu sudah
+        ada di server, nama file langsung dibuat tanpa mengirim isinya
+        (exists=True). jika belum, tidak ada yang diubah (exists=False) dan
+        client perlu mengirim UPLOAD biasa"""
+        try:
+            filename = params[0]
+            digest = params[1].lower()
+            if(filename == ''):
+                return None
+            check_filename(filename)
+            if not is_digest(digest):
+                return dict(status='ERROR',data=f'hash SHA-256 tidak valid: {params[1]}')
+            if not self.store.link(filename, digest):
+                return dict(status='OK',exists=False)
+            self.cache.invalidate(filename)
+            self.index.update(filename)
+            return dict(status='OK',exists=True)
+        except Exception as e:
+            return dict(status='ERROR',data=str(e))
+
+    def sync_signature(self,params=[]):
+        """SYNC_SIGNATURE <nama file> [block size]: checksum setiap blok file
+        di server, dipakai client untuk menyusun delta (lihat delta_sync.py)"""
+        try:
+            filename = params[0]
+            if(filename == ''):
+                return None
+            check_filename(filename)
+            with open(filename, 'rb') as fp:
+                st = os.fstat(fp.fileno())
+                block_size = int(params[1]) if len(params) > 1 else default_block_size(st.st_size)
+                if not MIN_BLOCK_SIZE <= block_size <= MAX_BLOCK_SIZE:
+                    return dict(status='ERROR',data=f'block size harus antara {MIN_BLOCK_SIZE} dan {MAX_BLOCK_SIZE}')
+                blocks = signature(fp, block_size)
+            return dict(status='OK',size=st.st_size,block_size=block_size,
+                        base=list(file_version(st)),blocks=blocks)
+        except Exception as e:
+            return dict(status='ERROR',data=str(e))
+
+    def sync_apply(self,params=[]):
+        """SYNC_APPLY <nama file> <delta JSON>: menyusun file baru dari blok file
+        lama dan data literal, lalu menggantinya sekaligus (atomic)"""
+        try:
+            filename = params[0]
+            if(filename == ''):
+                return None
+            check_filename(filename)
+            delta = json.loads(params[1])
+            fp = upload_temp_file(self.store.blob_dir)
+            try:
+                reused = self._apply_delta(filename, delta, fp)
+                fp.close()
+                self.store.store(filename, fp.name, delta['sha256'])
+            except Exception:
+                fp.close()
+                if os.path.exists(fp.name):
+                    os.remove(fp.name)
+                raise
+            self.cache.invalidate(filename)
+            self.index.update(filename)
+            return dict(status='OK',size=delta['size'],reused_bytes=reused,
+                        literal_bytes=delta['size'] - reused)
+        except Exception as e:
+            return dict(status='ERROR',data=str(e))
+
+    def stats(self,params=[]):
+        return dict(status='OK',data=dict(cache=self.cache.stats(),coalescing=self.inflight.stats(),
+                                          store=self.store.stats()))
+
+    # method dengan awalan _ tidak dapat dipanggil sebagai perintah protokol
+
+    def _list_options(self, params):
+        """LIST [pattern] [limit] [cursor] [--fields=size,mtime,type] [--stream]"""
+        positional = [p for p in params if not p.startswith('--')]
+        pattern = positional[0] if len(positional) > 0 and positional[0] else '*'
+        limit = None
+        if len(positional) > 1:
+            limit = int(positional[1])
+            if limit < 0:
+                raise ValueError('limit tidak boleh negatif')
+            # limit 0 berarti tanpa batas
+            limit = limit or None
+        start_after = decode_cursor(positional[2]) if len(positional) > 2 and positional[2] else None
+
+        fields = []
+        stream = False
+        for option in params:
+            if not option.startswith('--'):
+                continue
+            key, _, value = option[2:].partition('=')
+            if key == 'fields':
+                fields = [field for field in value.split(',') if field]
+                unknown = [field for field in fields if field not in LIST_FIELDS]
+                if unknown:
+                    raise ValueError(f'field tidak dikenal: {",".join(unknown)}')
+            elif key == 'stream':
+                stream = True
+            else:
+                raise ValueError(f'opsi tidak dikenal: {option}')
+        return pattern, limit, start_after, fields, stream
+
+    def _list_data(self, entries, fields):
+        if not fields:
+            return [entry.name for entry in entries]
+        return [dict(name=entry.name, **{field: getattr(entry, field) for field in fields})
+                for entry in entries]
+
+    def _list_pages(self, params):
+        """LIST --stream: hasil dibagi per LIST_PAGE_SIZE entry, setiap halaman
+        diambil dari index saat akan dikirim sehingga daftar lengkap tidak
+        pernah disusun di memori. halaman terakhir ditandai more=False"""
+        pattern, limit, start_after, fields, stream = self._list_options(params)
+        remaining = limit
+        while True:
+            size = LIST_PAGE_SIZE if remaining is None else min(LIST_PAGE_SIZE, remaining)
+            entries = self.index.listing(pattern, start_after, size + 1)
+            more = len(entries) > size
+            entries = entries[:size]
+            if remaining is not None:
+                remaining -= len(entries)
+            if entries:
+                start_after = entries[-1].name
+            done = not more or remaining == 0
+            page = dict(status='OK',data=self._list_data(entries, fields),more=not done)
+            if done:
+                # limit tercapai sebelum entry habis: client dapat melanjutkan dengan cursor
+                page['next_cursor'] = encode_cursor(start_after) if more else None
+                yield page
+                return
+            yield page
+
+    def _apply_delta(self, filename, delta, out):
+        block_size = delta['block_size']
+        digest = hashlib.sha256()
+        reused = 0
+        with open(filename, 'rb') as base:
+            # delta hanya berlaku untuk versi file yang signature-nya dipakai client
+            if list(file_version(os.fstat(base.fileno()))) != delta['base']:
+                raise ValueError('file sudah berubah sejak SYNC_SIGNATURE, ulangi sinkronisasi')
+            for op in delta['ops']:
+                if isinstance(op, int):
+                    data = os.pread(base.fileno(), block_size, op * block_size) if op >= 0 else b''
+                    if not data:
+                        raise ValueError(f'blok {op} tidak ada')
+                    reused += len(data)
+                else:
+                    data = base64.b64decode(op)
+                out.write(data)
+                digest.update(data)
+        size = out.tell()
+        if size != delta['size'] or digest.hexdigest() != delta['sha256']:
+            raise ValueError('hasil sinkronisasi tidak sesuai dengan hash file client')
+        return reused
+
+    def _get_range(self, filename, offset, length=None):
+        if offset < 0 or (length is not None and length < 0):
+            raise ValueError('offset dan length tidak boleh negatif')
+        with open(f"{filename}", 'rb') as fp:
+            st = os.fstat(fp.fileno())
+            if length is None:
+                length = max(0, st.st_size - offset)
+            mapped = map_file(fp, st.st_size) if length >= MMAP_THRESHOLD else None
+            if mapped is None:
+                data = os.pread(fp.fileno(), length, offset)
+                isifile = base64.b64encode(data).decode()
+                length = len(data)
+            else:
+                with mapped:
+                    with memoryview(mapped)[offset:offset + length] as part:
+                        isifile = base64.b64encode(part).decode()
+                        length = len(part)
+        # versi dikirim agar client dapat memastikan semua bagian berasal dari isi yang sama
+        return dict(status='OK',data_namafile=filename,data_file=isifile,
+                    offset=offset,length=length,size=st.st_size,version=list(file_version(st)))
+
+    def _get_stream(self, filename):
+        """Response GET untuk file minimal MMAP_THRESHOLD sebagai generator bytes,
+        isinya sama persis dengan json.dumps(self.get([filename])) tetapi dikirim
+        per potongan. base64 yang muat di cache diambil dari cache (miss bersamaan
+        di-encode sekali lewat SingleFlight, sama seperti get()), file yang lebih
+        besar dari batas cache di-encode per potongan dari mmap.
+        None jika file lebih kecil atau tidak dapat dibuka (dilayani get() biasa)"""
+        if not valid_filename(filename):
+            return None
+        try:
+            with open(f"{filename}", 'rb') as fp:
+                version = file_version(os.fstat(fp.fileno()))
+                if version[0] == 0 or version[0] < MMAP_THRESHOLD:
+                    return None
+                if 4 * ((version[0] + 2) // 3) <= self.cache.max_bytes:
+                    isifile = self._base64_of(filename, fp, version)
+                    return self._stream_envelope(filename, self._cached_chunks(isifile))
+                mapped = map_file(fp, version[0])
+        except OSError:
+            return None
+        return self._stream_envelope(filename, self._mapped_chunks(mapped))
+
+    def _stream_envelope(self, filename, chunks):
+        # urutan key dan pemisah mengikuti json.dumps(dict(status=..., data_namafile=..., data_file=...))
+        yield f'{{"status": "OK", "data_namafile": {json.dumps(filename)}, "data_file": "'.encode()
+        yield from chunks
+        yield b'"}'
+
+    def _cached_chunks(self, isifile):
+        chunk = STREAM_CHUNK // 3 * 4
+        for start in range(0, len(isifile), chunk):
+            yield isifile[start:start + chunk].encode()
+
+    def _mapped_chunks(self, mapped):
+        with mapped, memoryview(mapped) as view:
+            for start in range(0, len(view), STREAM_CHUNK):
+                yield binascii.b2a_base64(view[start:start + STREAM_CHUNK], newline=False)
+
+    def _read_file(self, filename):
+        check_filename(filename)
+        with open(f"{filename}", 'rb') as fp:
+            version = file_version(os.fstat(fp.fileno()))
+            key = ('raw', os.path.abspath(filename), version)
+
+            def load():
+                # file besar dikirim langsung dari mmap (sebagai memoryview, yang juga
+                # diterima transport asyncio). mmap tetap berlaku setelah file ditutup
+                # dan dilepas saat tidak dipakai lagi
+                mapped = map_file(fp, version[0])
+                return fp.read() if mapped is None else memoryview(mapped)
+            return self.inflight.do(key, load)
+
+    def _read_base64(self, filename):
+        with open(f"{filename}", 'rb') as fp:
+            # versi diambil dari file yang sudah terbuka agar sesuai dengan isi yang dibaca
+            version = file_version(os.fstat(fp.fileno()))
+            return self._base64_of(filename, fp, version)
+
+    def _base64_of(self, filename, fp, version):
+        """Isi fp (versi version) dalam base64, dari cache jika ada. miss bersamaan
+        untuk file dan versi yang sama hanya membaca dan meng-encode sekali"""
+        isifile = self.cache.get(filename, version)
+        if isifile is None:
+            def load():
+                mapped = map_file(fp, version[0])
+                if mapped is None:
+                    hasil = base64.b64encode(fp.read()).decode()
+                else:
+                    with mapped:
+                        hasil = base64.b64encode(mapped).decode()
+                self.cache.put(filename, version, hasil)
+                return hasil
+            key = ('base64', os.path.abspath(filename), version)
+            isifile = self.inflight.do(key, load)
+        return isifile
+
+    def _write_file(self, filename, data):
+        check_filename(filename)
+        # file yang ada tidak ditulis langsung karena isinya bisa dipakai nama lain
+        with upload_temp_file(self.store.blob_dir) as fp:
+            fp.write(data)
+        try:
+            self.store.store(filename, fp.name, hashlib.sha256(data).hexdigest())
+        except Exception:
+            if os.path.exists(fp.name):
+                os.remove(fp.name)
+            raise
+        self.cache.invalidate(filename)
+        self.index.update(filename)
+
+    def _open_upload(self, filename):
+        return UploadWriter(filename, self.store)
+
+    def _commit_upload(self, writer):
+        try:
+            if not valid_filename(writer.filename):
+                # isi upload sudah diterima ke file sementara, dibuang tanpa disimpan
+                writer.abort()
+            check_filename(writer.filename)
+            writer.commit()
+            self.cache.invalidate(writer.filename)
+            self.index.update(writer.filename)
+            return dict(status='OK')
+        except Exception as e:
+            return dict(status='ERROR',data=str(e))
+
 
 if __name__=='__main__':
     f = FileInterface()
@@ -1,8 +1,12 @@
 import json
 import logging
 import shlex
+import threading
 
 from file_interface import FileInterface
+from file_protocol_v2 import (OPCODES, STATUS_ERROR, STATUS_OK, TERMINATOR,
+                              encode_frame, encode_message)
+from frame_reader import StreamedUpload
 
 """
 * class FileProtocol bertugas untuk memproses 
@@ -13,43 +17,60 @@ protokol/aturan yang dibuat
 pada akhirnya akan diproses dalam bentuk string
 
 * class FileProtocol akan memproses data yang masuk dalam bentuk
-string
+string, atau dalam bentuk frame biner untuk protokol v2
 """
 
+# BATCH: jumlah maksimum perintah per batch, jumlah thread maksimum untuk menjalankannya
+BATCH_MAX_ITEMS = 1000
+BATCH_WORKERS = 8
+BATCH_COMMANDS = ('get', 'upload', 'delete', 'list')
+
+
 class FileProtocol:
     def __init__(self):
         self.file = FileInterface()
         
+    def parse_command(self, string_datamasuk):
+        """Memisahkan perintah dan parameternya, hasilnya (c_request, params)"""
+        # Use a more robust method for splitting commands
+        # This helps handle large base64 encoded files without shlex issues
+        if " " not in string_datamasuk:
+            return string_datamasuk.strip().lower(), []
+        parts = string_datamasuk.split(" ", 1)
+        c_request = parts[0].strip().lower()
+
+        # For UPLOAD command, we need special handling due to large base64 content
+        if c_request == "upload":
+            # Split only on the first space after the filename
+            return c_request, parts[1].split(" ", 1)
+        # BATCH membawa satu JSON list, tidak boleh dipecah
+        if c_request == "batch":
+            return c_request, [parts[1]]
+        # UPLOAD_PART: upload id, offset, lalu isi base64
+        if c_request == "upload_part":
+            return c_request, parts[1].split(" ", 2)
+        # SYNC_APPLY: nama file lalu delta JSON
+        if c_request == "sync_apply":
+            return c_request, parts[1].split(" ", 1)
+        # For other commands, use shlex for proper parameter parsing
+        try:
+            params = shlex.split(parts[1])
+        except Exception as e:
+            logging.warning(f"Error parsing parameters with shlex: {str(e)}")
+            params = parts[1].split()
+        return c_request, params
+
     def proses_string(self, string_datamasuk=''):
         logging.warning(f"processing string of length: {len(string_datamasuk)}")
+        c_request, params = self.parse_command(string_datamasuk)
+        return self.proses_command(c_request, params)
+
+    def proses_command(self, c_request, params):
+        logging.warning(f"processing request: {c_request} with {len(params)} parameters")
         try:
-            # Use a more robust method for splitting commands
-            # This helps handle large base64 encoded files without shlex issues
-            if " " not in string_datamasuk:
-                c_request = string_datamasuk.strip().lower()
-                params = []
-            else:
-                parts = string_datamasuk.split(" ", 1)
-                c_request = parts[0].strip().lower()
-                
-                if len(parts) > 1:
-                    # For UPLOAD command, we need special handling due to large base64 content
-                    if c_request == "upload":
-                        # Split only on the first space after the filename
-                        filename_and_content = parts[1].split(" ", 1)
-                        params = filename_and_content
-                    else:
-                        # For other commands, use shlex for proper parameter parsing
-                        try:
-                            params = shlex.split(parts[1])
-                        except Exception as e:
-                            logging.warning(f"Error parsing parameters with shlex: {str(e)}")
-                            params = parts[1].split()
-                else:
-                    params = []
-            
-            logging.warning(f"processing request: {c_request} with {len(params)} parameters")
-            if hasattr(self.file, c_request):
+            if c_request == 'batch':
+                return json.dumps(self.proses_batch(params))
+            if not c_request.startswith('_') and hasattr(self.file, c_request):
                 cl = getattr(self.file, c_request)(params)
                 return json.dumps(cl)
             else:
@@ -58,7 +79,152 @@ class FileProtocol:
             logging.warning(f"Error processing request: {str(e)}")
             return json.dumps(dict(status='ERROR', data=f'Error processing request: {str(e)}'))
 
+    def proses_batch(self, params):
+        """BATCH ["GET a.txt", "DELETE b.txt", ...]: beberapa perintah dalam satu
+        request, hasilnya list hasil per perintah dengan urutan yang sama.
+
+        perintah untuk file yang berbeda dijalankan bersamaan, perintah untuk
+        file yang sama tetap dijalankan berurutan. LIST menunggu semua perintah
+        sebelumnya selesai, sehingga hasilnya sudah memuat perubahan itu"""
+        try:
+            items = json.loads(params[0]) if params else None
+        except ValueError as e:
+            return dict(status='ERROR', data=f'Invalid batch: {str(e)}')
+        if not isinstance(items, list) or not all(isinstance(item, str) for item in items):
+            return dict(status='ERROR', data='BATCH membutuhkan JSON list berisi perintah')
+        if len(items) > BATCH_MAX_ITEMS:
+            return dict(status='ERROR', data=f'BATCH maksimum {BATCH_MAX_ITEMS} perintah')
+
+        commands = [self.parse_command(item) for item in items]
+        results = [None] * len(commands)
+        pending = []
+        for index, (c_request, item_params) in enumerate(commands):
+            if c_request == 'list':
+                self._run_batch(commands, pending, results)
+                pending = []
+                results[index] = self._batch_item(c_request, item_params)
+            else:
+                pending.append(index)
+        self._run_batch(commands, pending, results)
+        return dict(status='OK', data=results)
+
+    def _run_batch(self, commands, indexes, results):
+        # dikelompokkan per nama file, setiap kelompok dijalankan berurutan di satu thread
+        groups = {}
+        for index in indexes:
+            c_request, params = commands[index]
+            groups.setdefault(params[0] if params else '', []).append(index)
+
+        queue = iter(list(groups.values()))
+        lock = threading.Lock()
+
+        def worker():
+            while True:
+                with lock:
+                    group = next(queue, None)
+                if group is None:
+                    return
+                for index in group:
+                    results[index] = self._batch_item(*commands[index])
+
+        if len(groups) <= 1:
+            worker()
+            return
+        # thread dibuat per batch: ThreadPoolExecutor menolak tugas baru setelah
+        # thread utama selesai, padahal file_server.py melayani client di thread lain
+        threads = [threading.Thread(target=worker) for _ in range(min(BATCH_WORKERS, len(groups)))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _batch_item(self, c_request, params):
+        if c_request not in BATCH_COMMANDS:
+            return dict(status='ERROR', data=f'Command {c_request} tidak dapat dipakai dalam BATCH')
+        try:
+            hasil = getattr(self.file, c_request)(params)
+        except Exception as e:
+            return dict(status='ERROR', data=str(e))
+        if hasil is None:
+            return dict(status='ERROR', data='Missing filename')
+        return hasil
+
+    def proses_get_stream(self, stream):
+        yield from stream
+        yield TERMINATOR
+
+    def proses_list_stream(self, params):
+        """LIST --stream: satu pesan JSON per halaman, dibuat satu per satu
+        saat server siap mengirimkannya"""
+        logging.warning(f"processing streamed list with {len(params)} parameters")
+        try:
+            for page in self.file._list_pages(params):
+                yield encode_message(json.dumps(page).encode())
+        except Exception as e:
+            logging.warning(f"Error processing streamed list: {str(e)}")
+            yield encode_message(json.dumps(dict(status='ERROR', data=str(e), more=False)).encode())
+
+    def proses_frame(self, opcode, filename='', payload=b''):
+        """Memproses frame v2, hasilnya list buffer frame response"""
+        c_request = OPCODES.get(opcode)
+        logging.warning(f"processing v2 request: {c_request} {filename} with payload of length: {len(payload)}")
+        try:
+            if c_request == 'list':
+                hasil = self.file.list()
+                if hasil['status'] != 'OK':
+                    return encode_frame(STATUS_ERROR, '', hasil['data'].encode())
+                return encode_frame(STATUS_OK, '', json.dumps(hasil['data']).encode())
+            if filename == '':
+                return encode_frame(STATUS_ERROR, '', b'Missing filename')
+            if c_request == 'get':
+                return encode_frame(STATUS_OK, filename, self.file._read_file(filename))
+            if c_request == 'upload':
+                self.file._write_file(filename, payload)
+                return encode_frame(STATUS_OK, filename)
+            if c_request == 'delete':
+                hasil = self.file.delete([filename])
+                if hasil['status'] != 'OK':
+                    return encode_frame(STATUS_ERROR, filename, hasil['data'].encode())
+                return encode_frame(STATUS_OK, filename)
+            return encode_frame(STATUS_ERROR, filename, b'Unknown command')
+        except Exception as e:
+            logging.warning(f"Error processing v2 request: {str(e)}")
+            return encode_frame(STATUS_ERROR, filename, f'Error processing request: {str(e)}'.encode())
+
+    def open_upload(self, filename):
+        """Dipakai FrameReader untuk menulis isi UPLOAD langsung ke file sementara"""
+        return self.file._open_upload(filename)
+
+    def proses_upload(self, upload):
+        logging.warning(f"processing streamed upload: {upload.filename} ({upload.writer.size} bytes)")
+        hasil = self.file._commit_upload(upload.writer)
+        if upload.v2:
+            if hasil['status'] != 'OK':
+                return encode_frame(STATUS_ERROR, upload.filename, hasil['data'].encode())
+            return encode_frame(STATUS_OK, upload.filename)
+        return encode_message(json.dumps(hasil).encode())
+
+    def proses_message(self, message):
+        """Memproses pesan dari FrameReader, hasilnya list buffer yang dikirim
+        sekaligus (send_buffers), atau generator untuk hasil yang dikirim bertahap"""
+        if isinstance(message, StreamedUpload):
+            return self.proses_upload(message)
+        if isinstance(message, str):
+            logging.warning(f"processing string of length: {len(message)}")
+            c_request, params = self.parse_command(message)
+            if c_request == 'list' and '--stream' in params:
+                # generator: hasil dikirim per halaman, bukan satu list utuh
+                return self.proses_list_stream(params)
+            if c_request == 'get' and len(params) == 1:
+                # file besar: JSON dikirim per potongan, bukan satu string utuh
+                stream = self.file._get_stream(params[0])
+                if stream is not None:
+                    return self.proses_get_stream(stream)
+            hasil = self.proses_command(c_request, params)
+            return encode_message(hasil.encode())
+        return self.proses_frame(message.opcode, message.filename, message.payload)
+
 
 if __name__=='__main__':
     #contoh pemakaian
-    fp = FileProtocol()
\ No newline at end of file
+    fp = FileProtocol()
@@ -0,0 +1,128 @@
+import struct
+
+from scatter_write import SMALL_RESPONSE, sendmsg_all
+
+"""
+* protokol v2 adalah framing biner untuk file server, dipakai
+berdampingan dengan protokol lama (JSON + "\r\n\r\n") pada port yang sama
+
+* setiap frame diawali header tetap:
+  MAGIC (2 bytes) | OPCODE (1 byte) | panjang nama file (2 bytes) | panjang payload (8 bytes)
+  kemudian diikuti nama file (utf-8) dan payload (bytes mentah, tanpa base64)
+
+* byte pertama MAGIC (0xFA) tidak pernah muncul di awal string utf-8,
+sehingga server dapat membedakan frame v2 dari perintah lama hanya dari
+byte pertama yang diterima
+"""
+
+MAGIC = b'\xfa\x02'
+HEADER = struct.Struct('!2sBHQ')
+TERMINATOR = b'\r\n\r\n'
+
+# opcode request dari client
+OP_LIST = 1
+OP_GET = 2
+OP_UPLOAD = 3
+OP_DELETE = 4
+
+# opcode response dari server
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+OPCODES = {
+    OP_LIST: 'list',
+    OP_GET: 'get',
+    OP_UPLOAD: 'upload',
+    OP_DELETE: 'delete',
+}
+
+
+def is_v2(data):
+    """True jika data yang diterima diawali frame v2"""
+    return data[:1] == MAGIC[:1]
+
+
+def pack_header(opcode, name=b'', payload_length=0):
+    return HEADER.pack(MAGIC, opcode, len(name), payload_length)
+
+
+def unpack_header(data):
+    magic, opcode, name_length, payload_length = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError('Invalid v2 frame header')
+    return opcode, name_length, payload_length
+
+
+def encode_frame(opcode, filename='', payload=b''):
+    """Menyusun frame menjadi list buffer yang dikirim dengan sendmsg_all.
+    payload besar tidak disalin: header, nama file dan payload dikirim
+    sebagai buffer terpisah"""
+    name = filename.encode()
+    head = pack_header(opcode, name, len(payload))
+    if len(payload) <= SMALL_RESPONSE:
+        return [head + name + bytes(payload)]
+    return [head, name, payload]
+
+
+def encode_message(data):
+    """Pesan protokol lama (JSON diikuti TERMINATOR) sebagai list buffer,
+    data besar tidak disalin untuk digabung dengan TERMINATOR"""
+    if len(data) <= SMALL_RESPONSE:
+        return [data + TERMINATOR]
+    return [data, TERMINATOR]
+
+
+def send_buffers(sock, hasil):
+    """Mengirim hasil FileProtocol.proses_message: list buffer dikirim
+    sekaligus dengan sendmsg_all, generator dikirim per item begitu item
+    dibuat (item berupa bytes atau list buffer)"""
+    if isinstance(hasil, list):
+        if len(hasil) == 1:
+            sock.sendall(hasil[0])
+        else:
+            sendmsg_all(sock, hasil)
+        return
+    for item in hasil:
+        sendmsg_all(sock, item if isinstance(item, list) else [item])
+
+
+def send_frame(sock, opcode, filename='', payload=b''):
+    sendmsg_all(sock, encode_frame(opcode, filename, payload))
+
+
+def recv_exactly(sock, length):
+    """Membaca tepat sejumlah length bytes dari socket"""
+    data = bytearray(length)
+    view = memoryview(data)
+    received = 0
+    while received < length:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            raise ConnectionError('Connection closed before frame was complete')
+        received += n
+    return bytes(data)
+
+
+def recv_frame_header(sock):
+    """Membaca header dan nama file, payload dibiarkan di socket"""
+    opcode, name_length, payload_length = unpack_header(recv_exactly(sock, HEADER.size))
+    filename = recv_exactly(sock, name_length).decode()
+    return opcode, filename, payload_length
+
+
+def recv_frame(sock):
+    opcode, filename, payload_length = recv_frame_header(sock)
+    return opcode, filename, recv_exactly(sock, payload_length)
+
+
+def recv_payload_to_file(sock, payload_length, fileobj, chunk_size=1048576):
+    """Menyalin payload langsung ke file tanpa menampung seluruhnya di memori"""
+    buffer = bytearray(min(chunk_size, max(payload_length, 1)))
+    view = memoryview(buffer)
+    remaining = payload_length
+    while remaining > 0:
+        n = sock.recv_into(view[:min(remaining, len(buffer))])
+        if n == 0:
+            raise ConnectionError('Connection closed before frame was complete')
+        fileobj.write(view[:n])
+        remaining -= n
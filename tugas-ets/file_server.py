@@ -7,6 +7,8 @@ import sys
 
 
 from file_protocol import  FileProtocol
+from file_protocol_v2 import send_buffers
+from frame_reader import FrameReader
 fp = FileProtocol()
 
 
@@ -17,16 +19,20 @@ class ProcessTheClient(threading.Thread):
         threading.Thread.__init__(self)
 
     def run(self):
-        while True:
-            data = self.connection.recv(52428800)
-            if data:
-                d = data.decode()
-                hasil = fp.proses_string(d)
-                hasil=hasil+"\r\n\r\n"
-                self.connection.sendall(hasil.encode())
-            else:
-                break
-        self.connection.close()
+        reader = FrameReader(upload_opener=fp.open_upload)
+        try:
+            while True:
+                if reader.recv_from(self.connection):
+                    for message in reader.messages():
+                        send_buffers(self.connection, fp.proses_message(message))
+                else:
+                    break
+        except Exception as e:
+            logging.warning(f"Error: {str(e)}")
+        finally:
+            # upload yang terputus di tengah jalan dibuang bersama file sementaranya
+            reader.close()
+            self.connection.close()
 
 
 class Server(threading.Thread):
@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from file_protocol import FileProtocol
+from frame_reader import FrameReader
+
+"""
+* file server berbasis asyncio: satu proses dan satu event loop melayani
+banyak koneksi sekaligus, koneksi yang diam tidak memakan thread
+
+* pekerjaan yang menyentuh disk (membaca/menulis file, memproses perintah)
+dijalankan di ThreadPoolExecutor berukuran tetap, sehingga event loop
+tidak pernah terblokir oleh I/O file
+"""
+
+fp = FileProtocol()
+
+MAX_WORKERS = 8
+
+
+def collect_messages(reader):
+    """Dijalankan di executor karena upload streaming menulis ke disk"""
+    return list(reader.messages())
+
+
+class Server:
+    def __init__(self, ipaddress='0.0.0.0', port=8000, max_workers=MAX_WORKERS):
+        self.ipinfo = (ipaddress, port)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    async def handle_client(self, stream_reader, stream_writer):
+        address = stream_writer.get_extra_info('peername')
+        logging.warning(f"handling connection from {address}")
+        loop = asyncio.get_running_loop()
+        reader = FrameReader(upload_opener=fp.open_upload)
+        try:
+            while True:
+                data = await stream_reader.read(FrameReader.recv_size)
+                if not data:
+                    break
+                reader.feed(data)
+                messages = await loop.run_in_executor(self.executor, collect_messages, reader)
+                for message in messages:
+                    hasil = await loop.run_in_executor(self.executor, fp.proses_message, message)
+                    if isinstance(hasil, list):
+                        # semua buffer response diserahkan sekaligus ke transport
+                        stream_writer.writelines(hasil)
+                        await stream_writer.drain()
+                        continue
+                    # hasil berupa generator (LIST --stream, GET file besar), setiap
+                    # item dibuat di executor agar event loop tidak tertahan
+                    iterator = iter(hasil)
+                    while (item := await loop.run_in_executor(self.executor, next, iterator, None)) is not None:
+                        stream_writer.writelines(item if isinstance(item, list) else [item])
+                        await stream_writer.drain()
+        except Exception as e:
+            logging.warning(f"Error: {str(e)}")
+        finally:
+            logging.warning(f"closing connection from {address}")
+            reader.close()
+            stream_writer.close()
+
+    async def serve(self):
+        server = await asyncio.start_server(self.handle_client, *self.ipinfo,
+                                            reuse_address=True, backlog=1024)
+        logging.warning(f"server berjalan di ip address {self.ipinfo}")
+        async with server:
+            await server.serve_forever()
+
+    def run(self):
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            logging.warning("Server shutting down")
+        finally:
+            self.executor.shutdown(wait=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Asyncio file server')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS,
+                        help='Number of threads for disk work')
+    args = parser.parse_args()
+
+    svr = Server(ipaddress='0.0.0.0', port=args.port, max_workers=args.workers)
+    svr.run()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    main()
@@ -1,64 +1,114 @@
-from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Process
+import argparse
 import socket
 import logging
 from file_protocol import FileProtocol
+from file_protocol_v2 import send_buffers
+from frame_reader import FrameReader
 
 MAX_WORKERS = 4
+THREADS_PER_WORKER = 4
 
-def process_command(data: str) -> str:
-    """Function to be executed in the process pool"""
-    fp = FileProtocol()  # must be created inside the worker
-    result = fp.proses_string(data)
-    return result + "\r\n\r\n"
+"""
+* server prefork: beberapa proses worker menerima koneksi secara paralel
+(memakai banyak core), masing-masing dengan FileProtocol miliknya sendiri
+yang dibuat sekali saat worker mulai
 
-def handle_client(connection, address, executor):
-    """Handle client connection in the main thread; delegate CPU-bound task to process pool"""
+* jika SO_REUSEPORT tersedia, setiap worker membuka listening socket sendiri
+pada port yang sama dan kernel membagi koneksi baru ke worker. jika tidak,
+worker mewarisi satu listening socket yang dibuat oleh proses utama
+"""
+
+
+def make_listen_socket(ipinfo, reuse_port=False):
+    my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    my_socket.bind(ipinfo)
+    my_socket.listen(128)
+    return my_socket
+
+
+def handle_client(connection, address, fp):
+    """Handle client connection in a worker thread, using the worker's FileProtocol"""
     logging.warning(f"Handling connection from {address}")
+    reader = FrameReader(upload_opener=fp.open_upload)
     try:
-        d = ""
         while True:
-            data = connection.recv(52428800)  # 50MB max read size
-            if not data:
+            if not reader.recv_from(connection):
                 break
-            d += data.decode()
 
-            while "\r\n\r\n" in d:
-                cmd, d = d.split("\r\n\r\n", 1)
-                future = executor.submit(process_command, cmd)
-                result = future.result()
-                connection.sendall(result.encode())
+            for message in reader.messages():
+                send_buffers(connection, fp.proses_message(message))
     except Exception as e:
         logging.warning(f"Error handling {address}: {e}")
     finally:
         logging.warning(f"Closing connection from {address}")
+        reader.close()
         connection.close()
 
+
+def worker_main(worker_id, ipinfo, listen_socket=None, threads=THREADS_PER_WORKER):
+    """Accept loop of one worker process"""
+    fp = FileProtocol()
+    if listen_socket is None:
+        listen_socket = make_listen_socket(ipinfo, reuse_port=True)
+    logging.warning(f"Worker {worker_id} accepting on {ipinfo}")
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        try:
+            while True:
+                connection, address = listen_socket.accept()
+                logging.warning(f"Worker {worker_id} accepted connection from {address}")
+                executor.submit(handle_client, connection, address, fp)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            listen_socket.close()
+
+
 class Server:
-    def __init__(self, ip='0.0.0.0', port=8000):
+    def __init__(self, ip='0.0.0.0', port=8000, max_workers=MAX_WORKERS, threads=THREADS_PER_WORKER):
         self.ipinfo = (ip, port)
-        self.my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.max_workers = max_workers
+        self.threads = threads
 
     def run(self):
-        logging.warning(f"Server running on {self.ipinfo}")
-        self.my_socket.bind(self.ipinfo)
-        self.my_socket.listen(5)
-
-        with ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            try:
-                while True:
-                    connection, address = self.my_socket.accept()
-                    logging.warning(f"Accepted connection from {address}")
-                    handle_client(connection, address, executor)
-            except KeyboardInterrupt:
-                logging.warning("Server shutting down")
-            finally:
-                self.my_socket.close()
+        logging.warning(f"Server running on {self.ipinfo} with {self.max_workers} worker processes")
+        listen_socket = None
+        if not hasattr(socket, 'SO_REUSEPORT'):
+            listen_socket = make_listen_socket(self.ipinfo)
+
+        workers = []
+        for worker_id in range(self.max_workers):
+            worker = Process(target=worker_main, args=(worker_id, self.ipinfo, listen_socket, self.threads))
+            worker.start()
+            workers.append(worker)
+
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            logging.warning("Server shutting down")
+        finally:
+            for worker in workers:
+                worker.terminate()
+            if listen_socket is not None:
+                listen_socket.close()
 
 def main():
-    svr = Server(ip='0.0.0.0', port=8000)
+    parser = argparse.ArgumentParser(description='Prefork multiprocess file server')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS)
+    parser.add_argument('--threads', type=int, default=THREADS_PER_WORKER,
+                        help='Connections served concurrently by each worker process')
+    args = parser.parse_args()
+
+    svr = Server(ip='0.0.0.0', port=args.port, max_workers=args.workers, threads=args.threads)
     svr.run()
 
 if __name__ == '__main__':
     logging.basicConfig(level=logging.WARNING)
-    main()
\ No newline at end of file
+    main()
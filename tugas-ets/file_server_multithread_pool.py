@@ -1,10 +1,13 @@
 from socket import *
+import argparse
 import socket
 import threading
 import logging
 from concurrent.futures import ThreadPoolExecutor
 
 from file_protocol import FileProtocol
+from file_protocol_v2 import send_buffers
+from frame_reader import FrameReader
 fp = FileProtocol()
 
 MAX_WORKERS = 5
@@ -12,33 +15,29 @@ MAX_WORKERS = 5
 def handle_client(connection, address):
     """Handle client connection in a worker thread from the pool"""
     logging.warning(f"handling connection from {address}")
+    reader = FrameReader(upload_opener=fp.open_upload)
     try:
-        d = ""
         while True:
-            data = connection.recv(52428800)
-            if data:
-                d += data.decode()
-                while "\r\n\r\n" in d:
-                    cmd, d = d.split("\r\n\r\n", 1)
-                    hasil = fp.proses_string(cmd)
-                    hasil = hasil + "\r\n\r\n"
-                    connection.sendall(hasil.encode())
+            if reader.recv_from(connection):
+                for message in reader.messages():
+                    send_buffers(connection, fp.proses_message(message))
             else:
                 break
     except Exception as e:
         logging.warning(f"Error: {str(e)}")
     finally:
         logging.warning(f"closing connection from {address}")
+        reader.close()
         connection.close()
 
 class Server(threading.Thread):
-    def __init__(self, ipaddress='0.0.0.0', port=8889):
+    def __init__(self, ipaddress='0.0.0.0', port=8889, max_workers=MAX_WORKERS):
         self.ipinfo = (ipaddress, port)
         self.my_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.my_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 
         threading.Thread.__init__(self)
-        self.executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
         
     def run(self):
         logging.warning(f"server berjalan di ip address {self.ipinfo}")
@@ -59,7 +58,12 @@ class Server(threading.Thread):
             self.my_socket.close()
 
 def main():
-    svr = Server(ipaddress='0.0.0.0', port=8000)
+    parser = argparse.ArgumentParser(description='Thread pool file server')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS)
+    args = parser.parse_args()
+
+    svr = Server(ipaddress='0.0.0.0', port=args.port, max_workers=args.workers)
     svr.run()
 
 if __name__ == "__main__":
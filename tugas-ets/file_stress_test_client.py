@@ -1,6 +1,7 @@
 import socket
 import json
 import base64
+import hashlib
 import logging
 import os
 import sys
@@ -25,8 +26,12 @@ logging.basicConfig(
 )
 
 class StressTestClient:
-    def __init__(self, server_address=('localhost', 6667)):
+    def __init__(self, server_address=('localhost', 6667), list_page_size=1000, skip_existing=False):
         self.server_address = server_address
+        # upload diawali UPLOAD_IF_ABSENT, isi yang sudah ada di server tidak dikirim ulang
+        self.skip_existing = skip_existing
+        # LIST diminta per halaman, 0 berarti seluruh daftar dalam satu response
+        self.list_page_size = list_page_size
         self.results = {
             'upload': [],
             'download': [],
@@ -127,15 +132,28 @@ class StressTestClient:
         try:
             logging.info(f"Worker {worker_id}: Starting upload of {filename} ({file_size/1024/1024:.2f} MB)")
             
-            # Read file in chunks to avoid memory issues with large files
-            with open(file_path, 'rb') as fp:
-                file_content = base64.b64encode(fp.read()).decode()
+            result = None
+            if self.skip_existing:
+                digest = hashlib.sha256()
+                with open(file_path, 'rb') as fp:
+                    while chunk := fp.read(1024 * 1024):
+                        digest.update(chunk)
+                result = self.send_command(f"UPLOAD_IF_ABSENT {filename} {digest.hexdigest()}")
+                if result['status'] != 'OK' or not result['exists']:
+                    result = None
+                else:
+                    logging.info(f"Worker {worker_id}: {filename} already on server, upload skipped")
             
-            # Prepare command
-            command_str = f"UPLOAD {filename} {file_content}"
-            
-            # Send command
-            result = self.send_command(command_str)
+            if result is None:
+                # Read file in chunks to avoid memory issues with large files
+                with open(file_path, 'rb') as fp:
+                    file_content = base64.b64encode(fp.read()).decode()
+                
+                # Prepare command
+                command_str = f"UPLOAD {filename} {file_content}"
+                
+                # Send command
+                result = self.send_command(command_str)
             
             end_time = time.time()
             duration = end_time - start_time
@@ -241,15 +259,26 @@ class StressTestClient:
         start_time = time.time()
         
         try:
-            command_str = "LIST"
-            result = self.send_command(command_str)
+            # halaman diambil berurutan dengan cursor, yang disimpan hanya jumlah entry
+            file_count = 0
+            pages = 0
+            cursor = ""
+            while True:
+                command_str = f"LIST * {self.list_page_size} {cursor}".rstrip()
+                result = self.send_command(command_str)
+                if result['status'] != 'OK':
+                    break
+                file_count += len(result['data'])
+                pages += 1
+                cursor = result.get('next_cursor')
+                if not cursor:
+                    break
             
             end_time = time.time()
             duration = end_time - start_time
             
             if result['status'] == 'OK':
-                file_count = len(result['data'])
-                logging.info(f"Worker {worker_id}: List successful - {file_count} files in {duration:.2f}s")
+                logging.info(f"Worker {worker_id}: List successful - {file_count} files ({pages} pages) in {duration:.2f}s")
                 self.success_count['list'] += 1
             else:
                 logging.error(f"Worker {worker_id}: List failed: {result['data']}")
@@ -439,6 +468,10 @@ if __name__ == "__main__":
                         help='Server worker pool sizes to test against (default: 1 5 50)')
     parser.add_argument('--executor', choices=['thread', 'process', 'both'], default='thread', 
                         help='Executor type (default: thread)')
+    parser.add_argument('--list-page-size', type=int, default=1000,
+                        help='Entries per LIST page, 0 = whole list at once (default: 1000)')
+    parser.add_argument('--skip-existing', action='store_true',
+                        help='Hash files locally and skip uploading content the server already has')
     parser.add_argument('--debug', action='store_true', help='Enable debug logging')
     
     args = parser.parse_args()
@@ -463,7 +496,7 @@ if __name__ == "__main__":
         operations = [args.operation]
     
     # Create and run stress test client
-    client = StressTestClient((args.host, args.port))
+    client = StressTestClient((args.host, args.port), args.list_page_size, args.skip_existing)
     
     # Run a single test if specific parameters are provided
     if len(operations) == 1 and len(file_sizes) == 1 and len(client_pool_sizes) == 1 and len(server_pool_sizes) == 1:
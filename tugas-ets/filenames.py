@@ -0,0 +1,22 @@
+import os
+
+"""
+* nama file yang dikirim client hanya boleh berupa nama biasa di dalam
+folder files: tanpa folder (tidak mengandung /) dan tidak diawali titik
+
+* folder dan file tersembunyi (.blobs, .sessions, termasuk file sementara
+upload di dalamnya) adalah data internal server, sehingga tidak dapat
+dibaca, ditimpa atau dihapus lewat perintah protokol
+"""
+
+
+def valid_filename(filename):
+    return (filename != '' and filename == os.path.basename(filename)
+            and not filename.startswith('.') and '\0' not in filename)
+
+
+def check_filename(filename):
+    """Mengembalikan filename jika valid, ValueError jika tidak"""
+    if not valid_filename(filename):
+        raise ValueError(f'nama file tidak valid: {filename}')
+    return filename
@@ -0,0 +1,159 @@
+from collections import namedtuple
+
+from file_protocol_v2 import HEADER, OP_UPLOAD, TERMINATOR, is_v2, unpack_header
+
+"""
+* class FrameReader memisahkan aliran bytes dari socket menjadi pesan
+utuh, baik perintah lama (diakhiri "\r\n\r\n") maupun frame biner v2
+
+* data disimpan dalam satu bytearray, diisi dengan recv_into() lewat
+recv_from(), atau dengan feed() untuk sumber data lain. pencarian
+terminator dilanjutkan dari posisi terakhir yang sudah diperiksa, jadi
+biaya membaca satu request sebanding dengan ukurannya (bukan kuadratik)
+
+* decode utf-8 hanya dilakukan pada perintah yang sudah utuh, sehingga
+karakter multibyte yang terpotong di antara dua recv tidak merusak data
+
+* jika upload_opener diberikan, isi UPLOAD tidak ditampung di memori:
+begitu "UPLOAD <nama> " diterima, base64 didecode per potongan langsung
+ke file sementara, dan hasilnya dikembalikan sebagai StreamedUpload
+"""
+
+Frame = namedtuple('Frame', ['opcode', 'filename', 'payload'])
+StreamedUpload = namedtuple('StreamedUpload', ['filename', 'writer', 'v2'])
+
+UPLOAD_PREFIX = b'UPLOAD '
+
+
+class FrameReader:
+    recv_size = 1048576
+
+    def __init__(self, upload_opener=None):
+        self.buffer = bytearray()
+        self.scan = 0
+        self.chunk = None
+        self.upload_opener = upload_opener
+        self.upload = None
+        self.upload_remaining = 0
+
+    def recv_from(self, connection):
+        """Membaca dari socket langsung ke buffer, mengembalikan jumlah byte (0 jika koneksi ditutup)"""
+        if self.chunk is None:
+            # dialokasikan saat pertama dipakai, koneksi yang diam tidak memakan memori
+            self.chunk = bytearray(self.recv_size)
+        n = connection.recv_into(self.chunk)
+        if n:
+            with memoryview(self.chunk) as view:
+                self.buffer += view[:n]
+        return n
+
+    def feed(self, data):
+        self.buffer += data
+
+    def _consume(self, length):
+        # bytearray membuang bagian depan tanpa menyalin ulang seluruh isi
+        del self.buffer[:length]
+        self.scan = 0
+
+    def _find_terminator(self):
+        index = self.buffer.find(TERMINATOR, self.scan)
+        if index == -1:
+            # sisakan beberapa byte terakhir, bisa jadi awal dari terminator
+            self.scan = max(0, len(self.buffer) - len(TERMINATOR) + 1)
+        return index
+
+    def next_message(self):
+        """Mengembalikan str (perintah lama), Frame (v2), StreamedUpload, atau None jika belum lengkap"""
+        if self.upload is not None:
+            if self.upload.v2:
+                return self._next_upload_payload()
+            return self._next_upload_base64()
+        if not self.buffer:
+            return None
+        if is_v2(self.buffer):
+            return self._next_frame()
+        if self.upload_opener is not None and self._start_upload():
+            return self._next_upload_base64()
+        index = self._find_terminator()
+        if index == -1:
+            return None
+        with memoryview(self.buffer) as view:
+            command = str(view[:index], 'utf-8')
+        self._consume(index + len(TERMINATOR))
+        return command
+
+    def _next_frame(self):
+        if len(self.buffer) < HEADER.size:
+            return None
+        opcode, name_length, payload_length = unpack_header(self.buffer)
+        name_end = HEADER.size + name_length
+        frame_end = name_end + payload_length
+        if opcode == OP_UPLOAD and self.upload_opener is not None and len(self.buffer) >= name_end:
+            filename = self.buffer[HEADER.size:name_end].decode()
+            self._consume(name_end)
+            self.upload = StreamedUpload(filename, self.upload_opener(filename), True)
+            self.upload_remaining = payload_length
+            return self._next_upload_payload()
+        if len(self.buffer) < frame_end:
+            return None
+        with memoryview(self.buffer) as view:
+            filename = str(view[HEADER.size:name_end], 'utf-8')
+            payload = bytes(view[name_end:frame_end])
+        self._consume(frame_end)
+        return Frame(opcode, filename, payload)
+
+    def _start_upload(self):
+        """Membuka upload streaming jika buffer sudah berisi UPLOAD, nama file, dan spasi"""
+        if self.buffer[:len(UPLOAD_PREFIX)].upper() != UPLOAD_PREFIX:
+            return False
+        name_end = self.buffer.find(b' ', len(UPLOAD_PREFIX))
+        if name_end == -1:
+            return False
+        terminator = self.buffer.find(TERMINATOR, 0, name_end)
+        if terminator != -1 or name_end == len(UPLOAD_PREFIX):
+            # bukan upload dengan isi file, diproses sebagai perintah biasa
+            return False
+        filename = self.buffer[len(UPLOAD_PREFIX):name_end].decode()
+        self._consume(name_end + 1)
+        self.upload = StreamedUpload(filename, self.upload_opener(filename), False)
+        return True
+
+    def _next_upload_base64(self):
+        index = self._find_terminator()
+        if index == -1:
+            if self.scan:
+                self.upload.writer.write_base64(self.buffer[:self.scan])
+                self._consume(self.scan)
+            return None
+        self.upload.writer.write_base64(self.buffer[:index])
+        self._consume(index + len(TERMINATOR))
+        return self._finish_upload()
+
+    def _next_upload_payload(self):
+        if self.upload_remaining and self.buffer:
+            length = min(self.upload_remaining, len(self.buffer))
+            with memoryview(self.buffer) as view:
+                self.upload.writer.write(view[:length])
+            self._consume(length)
+            self.upload_remaining -= length
+        if self.upload_remaining:
+            return None
+        return self._finish_upload()
+
+    def _finish_upload(self):
+        upload = self.upload
+        self.upload = None
+        return upload
+
+    def close(self):
+        """Membuang upload yang belum selesai saat koneksi ditutup"""
+        if self.upload is not None:
+            self.upload.writer.abort()
+            self.upload = None
+
+    def messages(self):
+        while True:
+            message = self.next_message()
+            if message is None:
+                return
+            yield message
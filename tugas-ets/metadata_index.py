@@ -0,0 +1,220 @@
+import bisect
+import fnmatch
+import logging
+import os
+import re
+import sqlite3
+import stat
+import threading
+from collections import namedtuple
+
+"""
+* class MetadataIndex menyimpan metadata isi direktori penyimpanan
+(nama, ukuran, mtime, jenis) di memori, sehingga LIST tidak perlu
+membaca direktori dan melakukan stat untuk setiap file pada setiap request
+
+* nama disimpan terurut, listing dimulai dari posisi yang dicari dengan
+bisect, jadi biayanya sebanding dengan jumlah hasil (bukan isi direktori)
+
+* index diperbarui langsung oleh operasi yang mengubah file (upload,
+delete). perubahan dari luar (proses lain, file yang disalin manual)
+dicocokkan oleh reconcile(): satu kali os.scandir yang dijalankan
+berkala di thread terpisah, dan juga saat mtime direktori berubah
+
+* jika db_path diberikan, index juga disimpan di SQLite sehingga server
+yang baru dijalankan langsung punya index tanpa menunggu scandir pertama.
+penyimpanan ini hanya pelengkap: jika SQLite gagal (terkunci, read-only)
+kesalahannya dicatat dan index di memori tetap dipakai
+
+* file tersembunyi (diawali titik, termasuk file sementara upload)
+tidak dimasukkan ke index
+"""
+
+Entry = namedtuple('Entry', ['name', 'size', 'mtime', 'type'])
+
+
+def entry_from_stat(name, st, is_dir):
+    return Entry(name, st.st_size, st.st_mtime, 'dir' if is_dir else 'file')
+
+
+def literal_prefix(pattern):
+    """Bagian awal pattern glob sebelum karakter wildcard pertama"""
+    match = re.search(r'[*?\[]', pattern)
+    return pattern if match is None else pattern[:match.start()]
+
+
+class MetadataIndex:
+    def __init__(self, directory='.', db_path=None, reconcile_interval=30):
+        self.directory = directory
+        self.reconcile_interval = reconcile_interval
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.names = []
+        self.dir_mtime = None
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.db = None
+        # True jika penyimpanan ke SQLite terakhir gagal, tabel perlu ditulis ulang
+        self.db_dirty = False
+        if db_path is not None:
+            try:
+                self.db = sqlite3.connect(db_path, check_same_thread=False)
+                self.db.execute('CREATE TABLE IF NOT EXISTS entries '
+                                '(name TEXT PRIMARY KEY, size INTEGER, mtime REAL, type TEXT)')
+                self._load_db()
+            except sqlite3.Error as e:
+                logging.warning(f"index SQLite {db_path} tidak dapat dipakai: {str(e)}")
+                self.db = None
+        if self.db is None:
+            self.reconcile()
+
+    def _load_db(self):
+        rows = self.db.execute('SELECT name, size, mtime, type FROM entries').fetchall()
+        with self.lock:
+            self.entries = {row[0]: Entry(*row) for row in rows}
+            self.names = sorted(self.entries)
+
+    def start(self):
+        """Menjalankan reconcile berkala di thread daemon. aman dipanggil berulang,
+        juga di proses hasil fork yang tidak ikut membawa thread milik induknya"""
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        # jika index dimuat dari SQLite, cocokkan dengan isi direktori segera
+        if self.db is not None:
+            try:
+                self.reconcile()
+            except OSError as e:
+                logging.warning(f"reconcile index gagal: {str(e)}")
+        while not self.stop_event.wait(self.reconcile_interval):
+            try:
+                self.reconcile()
+            except OSError as e:
+                logging.warning(f"reconcile index gagal: {str(e)}")
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def reconcile(self):
+        """Menyamakan index dengan isi direktori dalam satu kali os.scandir"""
+        dir_mtime = os.stat(self.directory).st_mtime_ns
+        fresh = {}
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not self.indexed(entry.name):
+                    continue
+                try:
+                    fresh[entry.name] = entry_from_stat(entry.name, entry.stat(), entry.is_dir())
+                except OSError:
+                    # file dihapus saat scandir berjalan
+                    continue
+
+        with self.lock:
+            removed = [name for name in self.entries if name not in fresh]
+            changed = [entry for name, entry in fresh.items() if self.entries.get(name) != entry]
+            self.entries = fresh
+            # tanpa nama yang hilang, jumlah yang sama berarti tidak ada nama baru
+            if removed or len(self.names) != len(fresh):
+                self.names = sorted(fresh)
+            self.dir_mtime = dir_mtime
+            self._save(changed, removed)
+        return len(changed), len(removed)
+
+    def refresh_if_changed(self):
+        """Reconcile jika mtime direktori berubah (ada file ditambah/dihapus dari luar)"""
+        try:
+            dir_mtime = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            return
+        if dir_mtime != self.dir_mtime:
+            self.reconcile()
+
+    def indexed(self, name):
+        # hanya isi langsung direktori ini yang diindex, tanpa file tersembunyi
+        return name == os.path.basename(name) and not name.startswith('.')
+
+    def update(self, name):
+        """Dipanggil setelah file dibuat atau diubah"""
+        if not self.indexed(name):
+            return
+        try:
+            st = os.stat(self._path(name))
+        except OSError:
+            self.remove(name)
+            return
+        entry = entry_from_stat(name, st, stat.S_ISDIR(st.st_mode))
+        with self.lock:
+            if name not in self.entries:
+                bisect.insort(self.names, name)
+            self.entries[name] = entry
+            self._touch_dir()
+            self._save([entry], [])
+
+    def remove(self, name):
+        """Dipanggil setelah file dihapus"""
+        if not self.indexed(name):
+            return
+        with self.lock:
+            if self.entries.pop(name, None) is not None:
+                index = bisect.bisect_left(self.names, name)
+                del self.names[index]
+            self._touch_dir()
+            self._save([], [name])
+
+    def _touch_dir(self):
+        # perubahan ini sudah tercatat, tidak perlu memicu reconcile
+        try:
+            self.dir_mtime = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            pass
+
+    def _save(self, changed, removed):
+        """Dipanggil dengan self.lock dipegang"""
+        if self.db is None or not (changed or removed or self.db_dirty):
+            return
+        try:
+            with self.db:
+                if self.db_dirty:
+                    # penyimpanan sebelumnya gagal: seluruh index ditulis ulang
+                    self.db.execute('DELETE FROM entries')
+                    self.db.executemany('INSERT INTO entries VALUES (?, ?, ?, ?)', list(self.entries.values()))
+                else:
+                    self.db.executemany('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)', changed)
+                    self.db.executemany('DELETE FROM entries WHERE name = ?', [(name,) for name in removed])
+            self.db_dirty = False
+        except sqlite3.Error as e:
+            # file sudah tertulis dan index di memori sudah benar,
+            # SQLite disusulkan pada penyimpanan berikutnya (paling lambat reconcile berkala)
+            self.db_dirty = True
+            logging.warning(f"gagal menyimpan index ke SQLite: {str(e)}")
+
+    def get(self, name):
+        with self.lock:
+            return self.entries.get(name)
+
+    def listing(self, pattern=None, start_after=None, limit=None):
+        """Entry terurut nama yang cocok dengan pattern glob, dimulai setelah
+        start_after, paling banyak limit entry. jika pattern diawali teks biasa
+        (misalnya "foto_*"), hanya rentang nama dengan awalan itu yang diperiksa"""
+        self.refresh_if_changed()
+        prefix = literal_prefix(pattern) if pattern else ''
+        matcher = re.compile(fnmatch.translate(pattern)).match if pattern and pattern != '*' else None
+        result = []
+        with self.lock:
+            start = bisect.bisect_left(self.names, prefix)
+            if start_after is not None:
+                start = max(start, bisect.bisect_right(self.names, start_after))
+            for index in range(start, len(self.names)):
+                name = self.names[index]
+                if not name.startswith(prefix):
+                    break
+                if matcher is None or matcher(name):
+                    result.append(self.entries[name])
+                    if limit is not None and len(result) >= limit:
+                        break
+        return result
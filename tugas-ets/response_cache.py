@@ -0,0 +1,71 @@
+import os
+import threading
+from collections import OrderedDict
+
+"""
+* class ResponseCache menyimpan hasil encode file (misalnya base64 untuk GET)
+di memori dengan batas ukuran total dalam bytes
+
+* setiap entry dicatat per path bersama versinya (size, mtime_ns, inode),
+sehingga file yang berubah di disk otomatis dianggap miss
+
+* jika total ukuran melebihi batas, entry yang paling lama tidak dipakai
+dibuang lebih dulu (LRU)
+"""
+
+
+def file_version(stat_result):
+    return (stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino)
+
+
+class ResponseCache:
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, path, version):
+        path = os.path.abspath(path)
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry[0] == version:
+                self.entries.move_to_end(path)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                self._remove(path)
+            self.misses += 1
+            return None
+
+    def put(self, path, version, value):
+        if len(value) > self.max_bytes:
+            return
+        path = os.path.abspath(path)
+        with self.lock:
+            if path in self.entries:
+                self._remove(path)
+            self.entries[path] = (version, value)
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                oldest = next(iter(self.entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, path):
+        path = os.path.abspath(path)
+        with self.lock:
+            if path in self.entries:
+                self._remove(path)
+
+    def _remove(self, path):
+        version, value = self.entries.pop(path)
+        self.size -= len(value)
+
+    def stats(self):
+        with self.lock:
+            return dict(hits=self.hits, misses=self.misses, evictions=self.evictions,
+                        entries=len(self.entries), size=self.size, max_bytes=self.max_bytes)
@@ -2,13 +2,19 @@ import argparse
 import subprocess
 import sys
 
+SCRIPTS = {
+    "thread": "file_server_multithread_pool.py",
+    "process": "file_server_multiprocess_pool.py",
+    "async": "file_server_async.py",
+}
+
 
 def launch_server(model: str, num_workers: int):
-    if model not in {"thread", "process"}:
-        print("[ERROR] Invalid model. Choose 'thread' or 'process'.")
+    if model not in SCRIPTS:
+        print(f"[ERROR] Invalid model. Choose one of: {', '.join(SCRIPTS)}.")
         sys.exit(1)
 
-    script = "server_multithread_pool.py" if model == "thread" else "server_multiprocess_pool.py"
+    script = SCRIPTS[model]
     
     try:
         subprocess.run([sys.executable, script, "--workers", str(num_workers)], check=True)
@@ -18,7 +24,7 @@ def launch_server(model: str, num_workers: int):
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Launch the file server using a specific concurrency model.")
-    parser.add_argument("--model", type=str, required=True, choices=["thread", "process"], help="Concurrency model to use.")
+    parser.add_argument("--model", type=str, required=True, choices=list(SCRIPTS), help="Concurrency model to use.")
     parser.add_argument("--workers", type=int, required=True, help="Number of worker threads or processes.")
     
     args = parser.parse_args()
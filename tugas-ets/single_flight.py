@@ -0,0 +1,56 @@
+import threading
+
+"""
+* class SingleFlight menggabungkan pekerjaan yang sama yang diminta
+bersamaan: thread pertama untuk sebuah key menjalankan fungsinya, thread
+lain dengan key yang sama menunggu lalu menerima hasil (atau error) yang sama
+
+* setelah pekerjaan selesai key dilepas, permintaan berikutnya menjalankan
+fungsinya lagi (cache hasil diurus oleh ResponseCache)
+"""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.executed = 0
+        self.shared = 0
+
+    def do(self, key, fn):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self.calls[key] = call
+                self.executed += 1
+            else:
+                self.shared += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self.lock:
+                    del self.calls[key]
+                call.done.set()
+        else:
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self):
+        with self.lock:
+            return dict(executed=self.executed, shared=self.shared, in_flight=len(self.calls))
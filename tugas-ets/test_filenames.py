@@ -0,0 +1,84 @@
+import base64
+import hashlib
+import json
+import os
+import unittest
+
+from file_protocol import FileProtocol
+from file_protocol_v2 import HEADER, OP_DELETE, OP_UPLOAD, STATUS_ERROR
+from filenames import valid_filename
+
+"""
+* memastikan nama file dari client yang berupa path atau diawali titik
+ditolak, sehingga isi .blobs dan .sessions tidak dapat ditimpa atau dihapus
+
+* dijalankan dari folder tugas-ets: python -m unittest test_filenames
+"""
+
+NAME = 'test-filenames.txt'
+CONTENT = b'isi asli'
+
+
+class TestFilenames(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.fp = FileProtocol()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.fp.file.index.stop()
+
+    def setUp(self):
+        self.command('upload', f'{NAME} {base64.b64encode(CONTENT).decode()}')
+        self.blob = os.path.join('.blobs', hashlib.sha256(CONTENT).hexdigest())
+
+    def tearDown(self):
+        self.command('delete', NAME)
+
+    def command(self, c_request, params):
+        return json.loads(self.fp.proses_string(f'{c_request} {params}'))
+
+    def assert_blob_unchanged(self):
+        with open(self.blob, 'rb') as f:
+            self.assertEqual(f.read(), CONTENT)
+        with open(NAME, 'rb') as f:
+            self.assertEqual(f.read(), CONTENT)
+
+    def test_valid_filename(self):
+        self.assertTrue(valid_filename('a.txt'))
+        for name in ['', '.blobs', '.hidden', 'a/b', '../a', '/etc/passwd', 'a\0b']:
+            self.assertFalse(valid_filename(name), name)
+
+    def test_upload_blob_refused(self):
+        hasil = self.command('upload', f'{self.blob} {base64.b64encode(b"racun").decode()}')
+        self.assertEqual(hasil['status'], 'ERROR')
+        self.assert_blob_unchanged()
+
+    def test_delete_blob_refused(self):
+        self.assertEqual(self.command('delete', self.blob)['status'], 'ERROR')
+        self.assert_blob_unchanged()
+
+    def test_get_outside_files_refused(self):
+        self.assertEqual(self.command('get', '../file_interface.py')['status'], 'ERROR')
+        self.assertEqual(self.command('get', self.blob)['status'], 'ERROR')
+
+    def test_upload_init_session_refused(self):
+        self.assertEqual(self.command('upload_init', '.sessions/x 10')['status'], 'ERROR')
+        self.assertFalse(os.path.exists(os.path.join('.sessions', 'x')))
+
+    def test_streamed_upload_refused(self):
+        writer = self.fp.open_upload(self.blob)
+        writer.write(b'racun')
+        self.assertEqual(self.fp.file._commit_upload(writer)['status'], 'ERROR')
+        self.assertFalse(os.path.exists(writer.fp.name))
+        self.assert_blob_unchanged()
+
+    def test_v2_frames_refused(self):
+        for opcode in (OP_UPLOAD, OP_DELETE):
+            frame = b''.join(self.fp.proses_frame(opcode, self.blob, b'racun'))
+            self.assertEqual(HEADER.unpack_from(frame)[1], STATUS_ERROR)
+        self.assert_blob_unchanged()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import uuid
+
+"""
+* class UploadSessions menyimpan upload yang dikirim per bagian (part):
+UPLOAD_INIT membuat file sementara seukuran file tujuan, setiap UPLOAD_PART
+ditulis langsung ke posisinya dengan os.pwrite, dan UPLOAD_COMMIT
+memindahkan hasilnya ke nama tujuan setelah semua bagian lengkap
+
+* semua state disimpan di folder .sessions (bukan di memori), sehingga part
+dari satu upload boleh dikirim lewat beberapa koneksi yang dilayani thread
+atau proses server yang berbeda, dengan urutan bebas, dan boleh diulang
+
+* setiap session terdiri dari <id>.data (isi file), <id>.json (nama dan
+ukuran) dan <id>.parts (rentang yang sudah diterima, satu baris per part,
+ditulis dengan O_APPEND agar aman dari beberapa proses)
+
+* session yang tidak disentuh (tidak ada part baru) lebih dari SESSION_TTL
+detik dihapus saat UPLOAD_INIT berikutnya
+"""
+
+SESSION_DIR = '.sessions'
+SESSION_TTL = 24 * 60 * 60
+SESSION_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+
+class UploadSessions:
+    def __init__(self, directory='.', ttl=SESSION_TTL):
+        self.directory = os.path.join(directory, SESSION_DIR)
+        self.ttl = ttl
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, session_id, suffix):
+        if SESSION_ID_PATTERN.fullmatch(session_id) is None:
+            raise ValueError(f'upload id tidak valid: {session_id}')
+        return os.path.join(self.directory, f'{session_id}.{suffix}')
+
+    def init(self, filename, size):
+        if size < 0:
+            raise ValueError('ukuran file tidak boleh negatif')
+        self.cleanup()
+        session_id = uuid.uuid4().hex
+        fd = os.open(self._path(session_id, 'data'), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        try:
+            if size:
+                try:
+                    # blok disk dialokasikan sekarang, part yang datang acak tidak membuat file berlubang
+                    os.posix_fallocate(fd, 0, size)
+                except (AttributeError, OSError):
+                    os.ftruncate(fd, size)
+        finally:
+            os.close(fd)
+        with open(self._path(session_id, 'json'), 'w') as fp:
+            json.dump(dict(filename=filename, size=size), fp)
+        open(self._path(session_id, 'parts'), 'w').close()
+        return session_id
+
+    def info(self, session_id):
+        try:
+            with open(self._path(session_id, 'json')) as fp:
+                return json.load(fp)
+        except FileNotFoundError:
+            raise ValueError(f'upload {session_id} tidak ditemukan')
+
+    def write_part(self, session_id, offset, data):
+        size = self.info(session_id)['size']
+        if offset < 0 or offset + len(data) > size:
+            raise ValueError(f'part {offset}+{len(data)} di luar ukuran file {size}')
+        fd = os.open(self._path(session_id, 'data'), os.O_WRONLY)
+        try:
+            view = memoryview(data)
+            written = 0
+            while written < len(view):
+                written += os.pwrite(fd, view[written:], offset + written)
+        finally:
+            os.close(fd)
+        # dicatat setelah data tertulis, part yang gagal di tengah tidak dianggap diterima
+        fd = os.open(self._path(session_id, 'parts'), os.O_WRONLY | os.O_APPEND)
+        try:
+            os.write(fd, f'{offset} {len(data)}\n'.encode())
+        finally:
+            os.close(fd)
+
+    def missing(self, session_id):
+        """Rentang [awal, akhir) yang belum diterima"""
+        size = self.info(session_id)['size']
+        with open(self._path(session_id, 'parts')) as fp:
+            ranges = sorted(tuple(map(int, line.split())) for line in fp if line.strip())
+        missing = []
+        position = 0
+        for offset, length in ranges:
+            if offset > position:
+                missing.append([position, offset])
+            position = max(position, offset + length)
+        if position < size:
+            missing.append([position, size])
+        return missing
+
+    def finish(self, session_id):
+        """Mengembalikan (nama file, path data, sha256) jika semua part lengkap.
+        file .json dan .parts dihapus, path data menjadi milik pemanggil"""
+        info = self.info(session_id)
+        missing = self.missing(session_id)
+        if missing:
+            raise ValueError(f'part belum lengkap, rentang yang belum diterima: {missing[:10]}')
+        data_path = self._path(session_id, 'data')
+        digest = hashlib.sha256()
+        with open(data_path, 'rb') as fp:
+            while chunk := fp.read(1024 * 1024):
+                digest.update(chunk)
+        for suffix in ('json', 'parts'):
+            os.remove(self._path(session_id, suffix))
+        return info['filename'], data_path, digest.hexdigest()
+
+    def abort(self, session_id):
+        self.info(session_id)
+        for suffix in ('json', 'parts', 'data'):
+            try:
+                os.remove(self._path(session_id, suffix))
+            except FileNotFoundError:
+                pass
+
+    def cleanup(self):
+        # umur session dihitung dari file yang paling baru disentuh: .json tidak
+        # pernah ditulis lagi setelah UPLOAD_INIT, sedangkan .data dan .parts
+        # berubah di setiap UPLOAD_PART, sehingga upload yang masih aktif tidak ikut terhapus
+        deadline = time.time() - self.ttl
+        newest = {}
+        paths = {}
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                try:
+                    mtime = entry.stat().st_mtime
+                except OSError:
+                    continue
+                session_id = entry.name.partition('.')[0]
+                newest[session_id] = max(newest.get(session_id, mtime), mtime)
+                paths.setdefault(session_id, []).append(entry.path)
+        for session_id, mtime in newest.items():
+            if mtime >= deadline:
+                continue
+            for path in paths[session_id]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+            logging.warning(f"menghapus session upload lama: {session_id}")